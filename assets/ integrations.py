@@ -1,22 +1,47 @@
-from flask import Blueprint, jsonify, request, session
-from src.models.user import User, Integration, WebhookLog, db
-from datetime import datetime
+from flask import Blueprint, Response, current_app, jsonify, request, session, stream_with_context
+from sqlalchemy.orm import defer
+from src.models.user import Integration, WebhookLog, db
+from src.services.tenant_index import tenant_index, generate_inbound_token
+from src.services.log_pagination import keyset_page, decode_cursor, webhook_log_counts
+from src.services.log_retention import log_retention
+from src.services.log_export import EXPORT_FORMATS, iter_csv, iter_gzip, iter_ndjson
+from src.models.webhook_stats import WebhookStat
+from src.services.http_client import http_client
+from src.services.health_checks import integration_test_cache
+from src.services.circuit_breaker import circuit_breakers
+from src.services.twilio_clients import twilio_clients
+from src.services.instrumentation import instrumentation
+from src.services.identity_cache import identity_cache
+from src.models.events_db import events_session
+from src.services.payload_store import payload_store, log_record, log_summary
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timedelta
 import requests
+import time
 import json
 
 integrations_bp = Blueprint('integrations', __name__)
 
+# Shared pool for running integration checks concurrently; bounds outbound threads per worker
+integration_test_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='integration-test')
+
 def require_auth():
     if 'user_id' not in session:
         return jsonify({'error': 'Authentication required'}), 401
     
-    user = User.query.get(session['user_id'])
+    user = identity_cache.load_user(session['user_id'])
     if not user or not user.is_active:
         session.clear()
         return jsonify({'error': 'User not found or inactive'}), 401
     
     return user
 
+def date_arg(name):
+    """ISO 8601 query parameter as a datetime, or None when absent. Raises ValueError when malformed"""
+    # Not request.args.get(type=...): Werkzeug turns a ValueError there into the default
+    value = request.args.get(name)
+    return datetime.fromisoformat(value) if value else None
+
 @integrations_bp.route('/integrations', methods=['GET'])
 def get_integrations():
     user = require_auth()
@@ -61,10 +86,13 @@ def create_integration():
         
         # Set service-specific configuration
         config_data = data.get('config_data', {})
+        if service_name in ['zapier', 'make'] and not config_data.get('inbound_token'):
+            config_data['inbound_token'] = generate_inbound_token()
         integration.set_config(config_data)
         
         db.session.add(integration)
         db.session.commit()
+        tenant_index.invalidate()
         
         return jsonify({
             'message': 'Integration created successfully',
@@ -116,10 +144,19 @@ def update_integration(integration_id):
         if 'is_active' in data:
             integration.is_active = data['is_active']
         if 'config_data' in data:
-            integration.set_config(data['config_data'])
+            # Cached Twilio clients hold the old credentials
+            if integration.service_name == 'twilio':
+                twilio_clients.evict(integration.get_config().get('account_sid'))
+            config_data = dict(data['config_data'] or {})
+            # The inbound token is server-issued and baked into the provider's webhook URL; a config edit keeps it
+            if integration.service_name in ['zapier', 'make'] and not config_data.get('inbound_token'):
+                config_data['inbound_token'] = (integration.get_config().get('inbound_token')
+                                                or generate_inbound_token())
+            integration.set_config(config_data)
         
         integration.updated_at = datetime.utcnow()
         db.session.commit()
+        tenant_index.invalidate()
         
         return jsonify({
             'message': 'Integration updated successfully',
@@ -145,8 +182,13 @@ def delete_integration(integration_id):
         if not integration:
             return jsonify({'error': 'Integration not found'}), 404
         
+        if integration.service_name == 'twilio':
+            twilio_clients.evict(integration.get_config().get('account_sid'))
+        
         db.session.delete(integration)
         db.session.commit()
+        tenant_index.invalidate()
+        integration_test_cache.invalidate(integration_id)
         
         return jsonify({'message': 'Integration deleted successfully'})
         
@@ -172,24 +214,107 @@ def test_integration(integration_id):
         if not integration.is_active:
             return jsonify({'error': 'Integration is not active'}), 400
         
-        config = integration.get_config()
-        service_name = integration.service_name
-        
-        # Test based on service type
-        if service_name == 'twilio':
-            return test_twilio_integration(config)
-        elif service_name == 'gohighlevel':
-            return test_gohighlevel_integration(config)
-        elif service_name == 'zapier':
-            return test_zapier_integration(integration.webhook_url)
-        elif service_name == 'make':
-            return test_make_integration(integration.webhook_url)
-        else:
-            return jsonify({'error': 'Unknown service type'}), 400
+        status_code, body, cached = integration_test_cache.get_or_run(
+            integration.id,
+            integration.get_config(),
+            integration.webhook_url,
+            lambda: _unpack_test_result(run_integration_test(
+                integration.service_name,
+                integration.get_config(),
+                integration.webhook_url
+            ))
+        )
+        return jsonify(dict(body, cached=cached)), status_code
             
     except Exception as e:
         return jsonify({'error': 'Test failed', 'details': str(e)}), 500
 
+def run_integration_test(service_name, config, webhook_url):
+    """Dispatch to the service-specific test"""
+    if service_name == 'twilio':
+        return test_twilio_integration(config)
+    elif service_name == 'gohighlevel':
+        return test_gohighlevel_integration(config)
+    elif service_name == 'zapier':
+        return test_zapier_integration(webhook_url)
+    elif service_name == 'make':
+        return test_make_integration(webhook_url)
+    else:
+        return jsonify({'error': 'Unknown service type'}), 400
+
+def _unpack_test_result(result):
+    """Turn a test's Flask response into (status_code, body)"""
+    response, status_code = result if isinstance(result, tuple) else (result, 200)
+    return status_code, response.get_json()
+
+def _run_integration_test_in_app(app, integration_id, service_name, config, webhook_url):
+    """Run one (cached) test on a pool thread"""
+    with app.app_context():
+        status_code, body, cached = integration_test_cache.get_or_run(
+            integration_id, config, webhook_url,
+            lambda: _unpack_test_result(run_integration_test(service_name, config, webhook_url))
+        )
+        return status_code, dict(body, cached=cached)
+
+@integrations_bp.route('/integrations/test-all', methods=['POST'])
+def test_all_integrations():
+    user = require_auth()
+    if isinstance(user, tuple):  # Error response
+        return user
+    
+    max_deadline = current_app.config.get('INTEGRATION_TEST_DEADLINE', 12)
+    deadline = min(request.args.get('deadline', max_deadline, type=float), max_deadline)
+    
+    integrations = Integration.query.filter_by(user_id=user.id, is_active=True).all()
+    app = current_app._get_current_object()
+    
+    # Snapshot what each check needs; ORM objects stay on the request thread
+    futures = {
+        integration_test_pool.submit(
+            _run_integration_test_in_app, app, integration.id,
+            integration.service_name, integration.get_config(), integration.webhook_url
+        ): integration
+        for integration in integrations
+    }
+    
+    started = time.monotonic()
+    results = {}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            integration = futures[future]
+            try:
+                status_code, body = future.result()
+            except Exception as e:
+                status_code, body = 500, {'status': 'failed', 'error': str(e)}
+            results[integration.id] = {
+                'integration_id': integration.id,
+                'service_name': integration.service_name,
+                'status_code': status_code,
+                'result': body,
+                'elapsed_ms': round((time.monotonic() - started) * 1000)
+            }
+    except FuturesTimeoutError:
+        pass
+    
+    # Checks still running at the deadline are reported, not waited on
+    for future, integration in futures.items():
+        if integration.id not in results:
+            future.cancel()
+            results[integration.id] = {
+                'integration_id': integration.id,
+                'service_name': integration.service_name,
+                'status_code': 504,
+                'result': {'status': 'timeout', 'message': f'No result within {deadline:g}s'},
+                'elapsed_ms': None
+            }
+    
+    return jsonify({
+        'results': list(results.values()),
+        'completed': sum(1 for r in results.values() if r['status_code'] != 504),
+        'total': len(futures),
+        'elapsed_ms': round((time.monotonic() - started) * 1000)
+    })
+
 def test_twilio_integration(config):
     """Test Twilio integration by validating credentials"""
     try:
@@ -199,12 +324,13 @@ def test_twilio_integration(config):
         if not account_sid or not auth_token:
             return jsonify({'error': 'Twilio credentials missing'}), 400
         
-        # Test API call to Twilio
-        from twilio.rest import Client
-        client = Client(account_sid, auth_token)
+        # Test API call to Twilio with a cached client (SDK imported lazily)
+        client = twilio_clients.get(account_sid, auth_token)
         
-        # Try to fetch account info
-        account = client.api.accounts(account_sid).fetch()
+        # Try to fetch account info; repeated timeouts open the Twilio circuit
+        with circuit_breakers.guard('api.twilio.com', (requests.ConnectionError, requests.Timeout)), \
+                instrumentation.outbound('api.twilio.com'):
+            account = client.api.accounts(account_sid).fetch()
         
         return jsonify({
             'status': 'success',
@@ -234,10 +360,9 @@ def test_gohighlevel_integration(config):
             'Content-Type': 'application/json'
         }
         
-        response = requests.get(
+        response = http_client.get(
             'https://services.leadconnectorhq.com/locations/',
-            headers=headers,
-            timeout=10
+            headers=headers
         )
         
         if response.status_code == 200:
@@ -271,10 +396,9 @@ def test_zapier_integration(webhook_url):
             'timestamp': datetime.utcnow().isoformat()
         }
         
-        response = requests.post(
+        response = http_client.post(
             webhook_url,
-            json=test_payload,
-            timeout=10
+            json=test_payload
         )
         
         if response.status_code in [200, 201, 202]:
@@ -308,10 +432,9 @@ def test_make_integration(webhook_url):
             'timestamp': datetime.utcnow().isoformat()
         }
         
-        response = requests.post(
+        response = http_client.post(
             webhook_url,
-            json=test_payload,
-            timeout=10
+            json=test_payload
         )
         
         if response.status_code in [200, 201, 202]:
@@ -340,22 +463,215 @@ def get_webhook_logs():
         return user
     
     page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
     service = request.args.get('service', '')
     
-    query = WebhookLog.query.filter_by(user_id=user.id)
+    try:
+        since = date_arg('since')
+        until = date_arg('until')
+    except ValueError:
+        return jsonify({'error': 'Invalid date range'}), 400
+    
+    # Payloads are left out of listings unless asked for; the payload column itself is never read here
+    include_payload = request.args.get('include_payload', 'false').lower() == 'true'
+    query = events_session.query(WebhookLog).options(defer(WebhookLog.payload)).filter_by(user_id=user.id)
     
     if service:
         query = query.filter_by(service_name=service)
+    if since:
+        query = query.filter(WebhookLog.created_at >= since)
+    if until:
+        query = query.filter(WebhookLog.created_at < until)
+    
+    # Totals are cached briefly instead of running COUNT(*) on every page
+    count_key = (user.id, service, since, until)
     
-    logs = query.order_by(WebhookLog.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    # Ranges reaching past the hot window continue into the archive, which only cursor mode can page through
+    cutoff = log_retention.cutoff()
+    reads_archive = (since or until or cutoff) < cutoff
+    
+    # Cursor mode: ?after=<created_at,id> seeks straight to the next page
+    if 'after' in request.args or reads_archive:
+        after = request.args.get('after')
+        try:
+            logs, next_cursor = keyset_page(query, after, per_page)
+            before = decode_cursor(after) if after else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        items = serialize_logs(logs, include_payload)
+        if reads_archive and next_cursor is None:
+            # Database rows are exhausted; keep going from the archive files
+            if logs:
+                before = (logs[-1].created_at, logs[-1].id)
+            archived = log_retention.read_archive(
+                user.id, service or None, since, until, before, per_page - len(items) + 1
+            )
+            if not include_payload:
+                archived = [{k: v for k, v in record.items() if k != 'payload'} for record in archived]
+            items.extend(archived[:per_page - len(items)])
+            if len(archived) > per_page - len(logs):
+                created_at = items[-1]['created_at']
+                if isinstance(created_at, datetime):
+                    created_at = created_at.isoformat()
+                next_cursor = f"{created_at},{items[-1]['id']}"
+        
+        result = {
+            'logs': items,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+        if request.args.get('include_total', 'false').lower() == 'true':
+            result['total'] = webhook_log_counts.get(count_key, query.count)
+        return jsonify(result)
+    
+    logs = query.order_by(WebhookLog.created_at.desc(), WebhookLog.id.desc()).paginate(
+        page=page, per_page=per_page, error_out=False, count=False
     )
+    logs.total = webhook_log_counts.get(count_key, query.count)
     
     return jsonify({
-        'logs': [log.to_dict() for log in logs.items],
+        'logs': serialize_logs(logs.items, include_payload),
         'total': logs.total,
         'pages': logs.pages,
         'current_page': page
     })
 
+def serialize_logs(logs, include_payload=False):
+    if not include_payload:
+        return [log_summary(log) for log in logs]
+    payloads = payload_store.load(logs)
+    return [log_record(log, payloads[log.id]) for log in logs]
+
+@integrations_bp.route('/webhook-logs/<int:log_id>', methods=['GET'])
+def get_webhook_log(log_id):
+    user = require_auth()
+    if isinstance(user, tuple):  # Error response
+        return user
+    
+    log = events_session.query(WebhookLog).filter_by(id=log_id, user_id=user.id).first()
+    if not log:
+        return jsonify({'error': 'Webhook log not found'}), 404
+    
+    return jsonify(log_record(log, payload_store.load([log])[log.id]))
+
+@integrations_bp.route('/webhook-logs/export', methods=['GET'])
+def export_webhook_logs():
+    user = require_auth()
+    if isinstance(user, tuple):  # Error response
+        return user
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'Format must be ndjson or csv'}), 400
+    
+    try:
+        since = date_arg('since')
+        until = date_arg('until')
+    except ValueError:
+        return jsonify({'error': 'Invalid date range'}), 400
+    
+    service = request.args.get('service', '')
+    chunk_size = 1000
+    
+    query = events_session.query(WebhookLog).filter_by(user_id=user.id)
+    if service:
+        query = query.filter_by(service_name=service)
+    if since:
+        query = query.filter(WebhookLog.created_at >= since)
+    if until:
+        query = query.filter(WebhookLog.created_at < until)
+    
+    def records():
+        # Archived rows are older than anything still in the database
+        if (since or until or log_retention.cutoff()) < log_retention.cutoff():
+            yield from log_retention.iter_archive(user.id, service or None, since, until)
+        
+        # Server-side cursor: rows are fetched and released chunk_size at a time, payloads a chunk at a time
+        rows = query.order_by(WebhookLog.created_at, WebhookLog.id).yield_per(chunk_size)
+        chunk = []
+        for log in rows:
+            chunk.append(log)
+            if len(chunk) == chunk_size:
+                yield from serialize_logs(chunk, include_payload=True)
+                chunk = []
+        yield from serialize_logs(chunk, include_payload=True)
+    
+    encoder = iter_csv if export_format == 'csv' else iter_ndjson
+    body = encoder(records())
+    headers = {
+        'Content-Disposition': f'attachment; filename=webhook-logs.{export_format}'
+    }
+    
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = iter_gzip(body)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers=headers
+    )
+
+STATS_INTERVALS = {
+    'minute': lambda bucket: bucket,
+    'hour': lambda bucket: bucket.replace(minute=0),
+    'day': lambda bucket: bucket.replace(hour=0, minute=0),
+}
+
+@integrations_bp.route('/webhook-stats', methods=['GET'])
+def get_webhook_stats():
+    user = require_auth()
+    if isinstance(user, tuple):  # Error response
+        return user
+    
+    interval = request.args.get('interval', 'hour')
+    if interval not in STATS_INTERVALS:
+        return jsonify({'error': 'Interval must be minute, hour or day'}), 400
+    
+    try:
+        until = date_arg('until') or datetime.utcnow()
+        since = date_arg('since') or until - timedelta(days=1)
+    except ValueError:
+        return jsonify({'error': 'Invalid date range'}), 400
+    
+    service = request.args.get('service', '')
+    
+    # Answered from the per-minute rollup, never from raw webhook_logs
+    query = WebhookStat.query.filter(
+        WebhookStat.user_id == user.id,
+        WebhookStat.bucket >= since,
+        WebhookStat.bucket < until
+    )
+    if service:
+        query = query.filter_by(service_name=service)
+    
+    truncate = STATS_INTERVALS[interval]
+    series = {}
+    totals = {}
+    for stat in query.all():
+        key = (truncate(stat.bucket), stat.service_name, stat.event_type, stat.status)
+        series[key] = series.get(key, 0) + stat.count
+        
+        service_totals = totals.setdefault(stat.service_name, {'success': 0, 'failed': 0, 'total': 0})
+        service_totals['total'] += stat.count
+        if stat.status in service_totals:
+            service_totals[stat.status] += stat.count
+    
+    return jsonify({
+        'interval': interval,
+        'since': since,
+        'until': until,
+        'series': [
+            {
+                'bucket': bucket,
+                'service_name': service_name,
+                'event_type': event_type,
+                'status': status,
+                'count': count
+            }
+            for (bucket, service_name, event_type, status), count in sorted(series.items())
+        ],
+        'totals': totals
+    })
@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify, request, session
 from src.models.user import User, db
+from src.services.password_hashing import password_hasher, HashingBusyError
+from src.services.login_throttle import login_throttle
+from src.services.identity_cache import identity_cache
 from datetime import datetime
 import re
 
@@ -53,7 +56,7 @@ def register():
             first_name=first_name,
             last_name=last_name
         )
-        user.set_password(password)
+        user.password_hash = password_hasher.hash(password)
         
         db.session.add(user)
         db.session.commit()
@@ -67,6 +70,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except HashingBusyError:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please retry'}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed'}), 500
@@ -76,6 +82,13 @@ def login():
     try:
         data = request.get_json()
         
+        # Throttle by IP and account before any database query or hash
+        wait = login_throttle.check(request.remote_addr, data.get('email') if isinstance(data, dict) else None)
+        if wait:
+            response = jsonify({'error': 'Too many login attempts, please try again later'})
+            response.headers['Retry-After'] = str(int(wait) + 1)
+            return response, 429
+        
         if not data or not data.get('email') or not data.get('password'):
             return jsonify({'error': 'Email and password are required'}), 400
         
@@ -85,15 +98,20 @@ def login():
         # Find user
         user = User.query.filter_by(email=email).first()
         
-        if not user or not user.check_password(password):
+        if not user or not password_hasher.verify(user.password_hash, password):
             return jsonify({'error': 'Invalid email or password'}), 401
         
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 401
         
+        # Upgrade hashes made with an older method or cost while we have the plaintext
+        if password_hasher.needs_rehash(user.password_hash):
+            user.password_hash = password_hasher.hash(password)
+        
         # Update last login
         user.last_login = datetime.utcnow()
         db.session.commit()
+        identity_cache.invalidate(user.id)
         
         # Create session
         session['user_id'] = user.id
@@ -104,6 +122,8 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except HashingBusyError:
+        return jsonify({'error': 'Server busy, please retry'}), 503
     except Exception as e:
         return jsonify({'error': 'Login failed'}), 500
 
@@ -117,7 +137,7 @@ def get_current_user():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    user = User.query.get(session['user_id'])
+    user = identity_cache.load_user(session['user_id'])
     if not user:
         session.clear()
         return jsonify({'error': 'User not found'}), 401
@@ -135,12 +155,12 @@ def change_password():
         if not data or not data.get('current_password') or not data.get('new_password'):
             return jsonify({'error': 'Current password and new password are required'}), 400
         
-        user = User.query.get(session['user_id'])
+        user = identity_cache.load_user(session['user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 401
         
         # Verify current password
-        if not user.check_password(data['current_password']):
+        if not password_hasher.verify(user.password_hash, data['current_password']):
             return jsonify({'error': 'Current password is incorrect'}), 401
         
         # Validate new password
@@ -148,11 +168,15 @@ def change_password():
             return jsonify({'error': 'New password must be at least 8 characters with uppercase, lowercase, and number'}), 400
         
         # Update password
-        user.set_password(data['new_password'])
+        user.password_hash = password_hasher.hash(data['new_password'])
         db.session.commit()
+        identity_cache.invalidate(user.id)
         
         return jsonify({'message': 'Password changed successfully'}), 200
         
+    except HashingBusyError:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please retry'}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Password change failed'}), 500
@@ -0,0 +1,105 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one destination host.
+
+    closed -> open after `failure_threshold` failures in a row; open -> half-open
+    once `reset_timeout` has passed, letting a single trial call through; the
+    trial's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial_in_flight):
+                raise CircuitOpenError(f"Circuit open for {self.name}; failing fast")
+            if state == 'half-open':
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class CircuitBreakerRegistry:
+    """One CircuitBreaker per host, created on first use"""
+
+    def __init__(self, app=None):
+        self.failure_threshold = 5
+        self.reset_timeout = 30
+        self._breakers = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.failure_threshold = app.config.get('CIRCUIT_FAILURE_THRESHOLD', 5)
+        self.reset_timeout = app.config.get('CIRCUIT_RESET_TIMEOUT', 30)
+        with self._lock:
+            self._breakers = {}
+        app.extensions['circuit_breakers'] = self
+
+    def get(self, host):
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    host, CircuitBreaker(host, self.failure_threshold, self.reset_timeout)
+                )
+        return breaker
+
+    @contextmanager
+    def guard(self, host, failures=(Exception,)):
+        """Fail fast if the host's circuit is open; count `failures` raised inside the block"""
+        breaker = self.get(host)
+        breaker.before_call()
+        try:
+            yield breaker
+        except failures:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            # Anything else (bad credentials, 4xx) says nothing about host health
+            breaker.record_success()
+            raise
+        else:
+            breaker.record_success()
+
+    def states(self):
+        return {host: breaker.state for host, breaker in list(self._breakers.items())}
+
+
+circuit_breakers = CircuitBreakerRegistry()
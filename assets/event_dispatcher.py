@@ -0,0 +1,305 @@
+import atexit
+import heapq
+import itertools
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src.models.user import db
+from src.models.outbound_events import OutboundDeadLetter
+from src.services.http_client import http_client
+from src.services.tenant_index import tenant_index
+
+# Receivers answering with these statuses may succeed later; any other 4xx is final
+RETRYABLE_STATUSES = {408, 409, 425, 429}
+
+
+class Destination:
+    """Pending items and in-flight count for one webhook URL.
+
+    Pending items are (user_id, integration_id, envelope, attempts) tuples.
+    """
+
+    def __init__(self, url, accepts_batches=False):
+        self.url = url
+        self.accepts_batches = accepts_batches
+        self.pending = deque()
+        self.in_flight = 0
+        self.last_active = time.monotonic()
+
+
+class EventDispatcher:
+    """Fans domain events out to every active Zapier/Make integration's webhook_url.
+
+    Producers only enqueue. A router thread resolves destinations from the
+    tenant index, a bounded worker pool delivers with a per-destination
+    concurrency cap, failed deliveries are retried with exponential backoff,
+    and deliveries that run out of attempts are written to
+    outbound_dead_letters. Each destination queues at most `max_pending`
+    items; past that, new events for it are dead-lettered straight away and
+    counted in `overflowed`, so a slow or dead receiver can't grow memory
+    without bound. Destinations idle for `idle_timeout` seconds are dropped.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.workers = 8
+        self.per_destination = 2
+        self.batch_size = 25
+        self.max_attempts = 5
+        self.backoff = 1.0
+        self.max_pending = 1000
+        self.idle_timeout = 300
+        self.overflowed = 0
+        self._intake = None
+        self._destinations = {}
+        self._retries = []
+        self._sequence = itertools.count()
+        self._evicted_at = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pool = None
+        self._threads = []
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.shutdown()
+        self.app = app
+        self.enabled = app.config.get('DISPATCH_ENABLED', True)
+        self.workers = app.config.get('DISPATCH_WORKERS', 8)
+        self.per_destination = app.config.get('DISPATCH_PER_DESTINATION_CONCURRENCY', 2)
+        self.batch_size = app.config.get('DISPATCH_BATCH_SIZE', 25)
+        self.max_attempts = app.config.get('DISPATCH_MAX_ATTEMPTS', 5)
+        self.backoff = app.config.get('DISPATCH_RETRY_BACKOFF', 1.0)
+        self.max_pending = app.config.get('DISPATCH_MAX_PER_DESTINATION', 1000)
+        self.idle_timeout = app.config.get('DISPATCH_DESTINATION_IDLE', 300)
+        self._intake = queue.Queue(maxsize=app.config.get('DISPATCH_MAX_QUEUE', 10000))
+        app.extensions['event_dispatcher'] = self
+
+    def start(self):
+        if any(thread.is_alive() for thread in self._threads):
+            return
+
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='event-dispatch')
+        self._threads = [
+            threading.Thread(target=self._route, name='event-dispatch-router', daemon=True),
+            threading.Thread(target=self._schedule_retries, name='event-dispatch-retry', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.shutdown)
+
+    def pending(self):
+        """Events waiting to be routed, deliveries queued per destination and deliveries waiting to retry"""
+        with self._lock:
+            queued = sum(len(destination.pending) for destination in self._destinations.values())
+            retrying = sum(len(items) for _, _, _, items in self._retries)
+        return {'intake': self._intake.qsize() if self._intake else 0, 'queued': queued, 'retrying': retrying}
+
+    def dispatch(self, user_id, event_type, data, source=None):
+        """Queue an event for every destination of the user. Never blocks; False if dropped"""
+        if not self.enabled or not self._threads:
+            return False
+
+        envelope = {
+            'id': str(uuid.uuid4()),
+            'event': event_type,
+            'occurred_at': datetime.utcnow().isoformat(),
+            'data': data
+        }
+        try:
+            self._intake.put_nowait((user_id, source, envelope))
+            return True
+        except queue.Full:
+            print(f"Dropping outbound event {event_type}: dispatch queue full")
+            return False
+
+    def _route(self):
+        while not self._stop.is_set():
+            self._evict_idle()
+            try:
+                user_id, source, envelope = self._intake.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                destinations = self._destinations_for(user_id, source)
+            except Exception as e:
+                print(f"Failed to resolve destinations for {envelope['event']}: {e}")
+                continue
+
+            for integration_id, url, accepts_batches in destinations:
+                item = (user_id, integration_id, envelope, 0)
+                with self._lock:
+                    destination = self._destinations.get(url)
+                    if destination is None:
+                        destination = self._destinations[url] = Destination(url)
+                    destination.accepts_batches = accepts_batches
+                    destination.last_active = time.monotonic()
+                    full = len(destination.pending) >= self.max_pending
+                    if full:
+                        self.overflowed += 1
+                    else:
+                        destination.pending.append(item)
+                if full:
+                    # Off the router thread; one backed-up receiver must not stall the rest
+                    self._pool.submit(self._dead_letter, destination, [item], 'Destination queue full')
+                else:
+                    self._pump(destination)
+
+    def _destinations_for(self, user_id, source):
+        with self.app.app_context():
+            try:
+                return [
+                    (target.integration_id, target.url, target.accepts_batches)
+                    for target in tenant_index.destinations(user_id)
+                    if target.service_name != source
+                ]
+            finally:
+                db.session.remove()
+
+    def _evict_idle(self):
+        """Forget destinations with nothing queued, in flight or retrying for `idle_timeout` seconds"""
+        now = time.monotonic()
+        if now - self._evicted_at < min(self.idle_timeout, 60):
+            return
+        self._evicted_at = now
+        with self._lock:
+            retrying = {destination.url for _, _, destination, _ in self._retries}
+            for url, destination in list(self._destinations.items()):
+                if (not destination.pending and not destination.in_flight and url not in retrying
+                        and now - destination.last_active > self.idle_timeout):
+                    del self._destinations[url]
+
+    def _pump(self, destination):
+        """Start deliveries for a destination up to its concurrency cap"""
+        with self._lock:
+            if self._stop.is_set():
+                return
+            while destination.pending and destination.in_flight < self.per_destination:
+                count = self.batch_size if destination.accepts_batches else 1
+                items = [destination.pending.popleft() for _ in range(min(count, len(destination.pending)))]
+                destination.in_flight += 1
+                self._pool.submit(self._deliver, destination, items)
+
+    def _deliver(self, destination, items):
+        error = None
+        retryable = True
+        try:
+            envelopes = [envelope for _, _, envelope, _ in items]
+            body = envelopes if destination.accepts_batches else envelopes[0]
+            response = http_client.post(destination.url, json=body, idempotent=False)
+            if 200 <= response.status_code < 300:
+                return
+            error = f"Receiver returned status {response.status_code}"
+            retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES
+        except Exception as e:
+            error = str(e)
+        finally:
+            with self._lock:
+                destination.in_flight -= 1
+                destination.last_active = time.monotonic()
+            if error is not None:
+                self._failed(destination, items, error, retryable)
+            self._pump(destination)
+
+    def _failed(self, destination, items, error, retryable):
+        items = [(user_id, integration_id, envelope, attempts + 1)
+                 for user_id, integration_id, envelope, attempts in items]
+        attempts = max(item[3] for item in items)
+
+        if retryable and attempts < self.max_attempts and not self._stop.is_set():
+            delay = self.backoff * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+            with self._wakeup:
+                heapq.heappush(self._retries, (time.monotonic() + delay, next(self._sequence), destination, items))
+                self._wakeup.notify()
+        else:
+            self._dead_letter(destination, items, error)
+
+    def _schedule_retries(self):
+        while not self._stop.is_set():
+            with self._wakeup:
+                if not self._retries:
+                    self._wakeup.wait(0.5)
+                    continue
+                due, _, destination, items = self._retries[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    continue
+                heapq.heappop(self._retries)
+                # Retries jump the queue so a destination's order is mostly kept
+                destination.pending.extendleft(reversed(items))
+            self._pump(destination)
+
+    def _dead_letter(self, destination, items, error):
+        with self.app.app_context():
+            try:
+                for user_id, integration_id, envelope, attempts in items:
+                    letter = OutboundDeadLetter(
+                        user_id=user_id,
+                        integration_id=integration_id,
+                        destination_url=destination.url,
+                        event_type=envelope['event'],
+                        attempts=attempts,
+                        last_error=error
+                    )
+                    letter.set_payload(envelope)
+                    db.session.add(letter)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Failed to dead-letter {len(items)} outbound events: {e}")
+            finally:
+                db.session.remove()
+
+    def shutdown(self, timeout=10):
+        """Stop routing, let in-flight deliveries finish, dead-letter everything still queued"""
+        if not self._threads:
+            return
+
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._pool.shutdown(wait=True)
+
+        leftovers = [(d, list(d.pending)) for d in self._destinations.values() if d.pending]
+        leftovers.extend((destination, items) for _, _, destination, items in self._retries)
+        leftovers.extend(self._drain_intake())
+        for destination, items in leftovers:
+            self._dead_letter(destination, items, 'Dispatcher shut down before delivery')
+        self._destinations = {}
+        self._retries = []
+
+    def _drain_intake(self):
+        """Events the router never picked up, grouped by destination for dead-lettering"""
+        unrouted = {}
+        while True:
+            try:
+                user_id, source, envelope = self._intake.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                destinations = self._destinations_for(user_id, source)
+            except Exception as e:
+                print(f"Failed to resolve destinations for {envelope['event']}: {e}")
+                continue
+            for integration_id, url, _ in destinations:
+                destination, items = unrouted.setdefault(url, (Destination(url), []))
+                items.append((user_id, integration_id, envelope, 0))
+        return list(unrouted.values())
+
+
+event_dispatcher = EventDispatcher()
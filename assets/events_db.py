@@ -0,0 +1,74 @@
+"""Session and helpers for the 'events' database bind.
+
+Webhook logs and other high-volume event tables live in their own database
+(a separate SQLite file by default), so a webhook storm never holds the
+write lock that logins and integration edits need. Event models declare
+``__bind_key__ = 'events'``; WebhookLog is routed through ``events_session``
+because its table is declared on the default metadata.
+"""
+from flask.globals import app_ctx
+from flask_sqlalchemy.query import Query
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from src.models.user import WebhookLog, db
+
+EVENTS_BIND = 'events'
+
+
+def events_engine():
+    """Engine for the events bind; the default engine when no separate bind is configured"""
+    return db.engines.get(EVENTS_BIND, db.engine)
+
+
+class EventsSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        return bind or events_engine()
+
+
+def _app_context_scope():
+    # Same scoping as db.session: one session per app context
+    return id(app_ctx._get_current_object())
+
+
+# Query class from Flask-SQLAlchemy so .paginate() keeps working on event queries
+events_session = scoped_session(
+    sessionmaker(class_=EventsSession, query_cls=Query),
+    scopefunc=_app_context_scope
+)
+
+
+def init_events_db(app):
+    """Remove the events session with the app context and register the migration command"""
+
+    @app.teardown_appcontext
+    def remove_events_session(exception=None):
+        events_session.remove()
+
+    @app.cli.command('move-webhook-logs')
+    def move_webhook_logs_command():
+        """Copy webhook_logs from the main database into the events database."""
+        print(f"Moved {move_webhook_logs()} webhook logs")
+
+
+def move_webhook_logs(chunk_size=5000):
+    """Move rows written before the split from the main database, chunk by chunk.
+
+    Run once after upgrading, before the events database takes new writes.
+    """
+    source, target = db.engine, events_engine()
+    # Separate binds on the same database are still separate Engine objects
+    if source.url.render_as_string(hide_password=True) == target.url.render_as_string(hide_password=True):
+        return 0
+
+    table = WebhookLog.__table__
+    moved = 0
+    while True:
+        with source.begin() as src:
+            rows = src.execute(table.select().order_by(table.c.id).limit(chunk_size)).mappings().all()
+            if not rows:
+                break
+            with target.begin() as dst:
+                dst.execute(table.insert(), [dict(row) for row in rows])
+            src.execute(table.delete().where(table.c.id.in_([row['id'] for row in rows])))
+        moved += len(rows)
+    return moved
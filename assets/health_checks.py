@@ -0,0 +1,52 @@
+import hashlib
+import json
+import threading
+import time
+
+
+def config_fingerprint(config, webhook_url):
+    """Hash of everything a test depends on; any config change yields a new fingerprint"""
+    material = json.dumps({'config': config, 'webhook_url': webhook_url or ''}, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class TestResultCache:
+    """Remembers the last test result per integration for a short TTL"""
+
+    def __init__(self, app=None):
+        self.ttl = 60
+        self.failure_ttl = 10
+        self._entries = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('INTEGRATION_TEST_CACHE_TTL', 60)
+        self.failure_ttl = app.config.get('INTEGRATION_TEST_FAILURE_TTL', 10)
+        app.extensions['integration_test_cache'] = self
+
+    def get_or_run(self, integration_id, config, webhook_url, run):
+        """Return a cached (status_code, body, cached) or call run() -> (status_code, body)"""
+        fingerprint = config_fingerprint(config, webhook_url)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(integration_id)
+        if entry and entry[0] == fingerprint and entry[1] > now:
+            return entry[2], entry[3], True
+
+        status_code, body = run()
+
+        # Failures expire sooner so a recovered provider is noticed quickly
+        ttl = self.ttl if status_code < 400 else self.failure_ttl
+        with self._lock:
+            self._entries[integration_id] = (fingerprint, now + ttl, status_code, body)
+        return status_code, body, False
+
+    def invalidate(self, integration_id):
+        with self._lock:
+            self._entries.pop(integration_id, None)
+
+
+integration_test_cache = TestResultCache()
@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.services.circuit_breaker import circuit_breakers
+from src.services.instrumentation import instrumentation
+
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class HttpClient:
+    """Shared outbound HTTP client with keep-alive pools per destination host.
+
+    One HTTPAdapter (and so one urllib3 PoolManager) is shared by every thread;
+    each thread gets its own Session on top of it so cookies and other session
+    state never leak between requests.
+    """
+
+    def __init__(self, app=None):
+        self.pool_connections = 32
+        self.pool_maxsize = 10
+        self.connect_timeout = 3.05
+        self.read_timeout = 10
+        self.max_retries = 2
+        self.backoff = 0.2
+        self._adapter = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._retries = 0
+        self._build_adapter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.pool_connections = app.config.get('OUTBOUND_POOL_CONNECTIONS', 32)
+        self.pool_maxsize = app.config.get('OUTBOUND_POOL_MAXSIZE', 10)
+        self.connect_timeout = app.config.get('OUTBOUND_CONNECT_TIMEOUT', 3.05)
+        self.read_timeout = app.config.get('OUTBOUND_READ_TIMEOUT', 10)
+        self.max_retries = app.config.get('OUTBOUND_MAX_RETRIES', 2)
+        self.backoff = app.config.get('OUTBOUND_RETRY_BACKOFF', 0.2)
+        self._build_adapter()
+        app.extensions['http_client'] = self
+
+    def _build_adapter(self):
+        if self._adapter is not None:
+            self._adapter.close()
+        # pool_connections = host pools kept alive, pool_maxsize = connections per host
+        self._adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=0
+        )
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        """Send a request, retrying idempotent calls with jittered exponential backoff.
+
+        Raises CircuitOpenError without touching the network while the host's circuit is open.
+        """
+        method = method.upper()
+        host = urlsplit(url).netloc
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+
+        attempts = self.max_retries + 1 if idempotent else 1
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                with circuit_breakers.guard(host, (requests.ConnectionError, requests.Timeout)), \
+                        instrumentation.outbound(host):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+                response.close()
+
+            with self._lock:
+                self._retries += 1
+            # Full jitter keeps retries from many workers from arriving in lockstep
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        """Pool hit/miss counters for the host pools currently alive"""
+        requests_sent = 0
+        connections_opened = 0
+        pools = self._adapter.poolmanager.pools
+        live_pools = [pool for pool in (pools.get(key) for key in pools.keys()) if pool is not None]
+        for pool in live_pools:
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
+
+        return {
+            'hosts': len(live_pools),
+            'requests': requests_sent,
+            'pool_hits': requests_sent - connections_opened,
+            'pool_misses': connections_opened,
+            'retries': self._retries
+        }
+
+
+http_client = HttpClient()
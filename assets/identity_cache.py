@@ -0,0 +1,92 @@
+import threading
+import time
+
+from flask import g
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from src.models.user import User, db
+
+# Never kept in memory; require_auth doesn't need it and an access loads it from the database
+EXCLUDED_COLUMNS = {'password_hash'}
+
+
+class IdentityCache:
+    """Loaded-user cache for session-authenticated routes.
+
+    Within a request the user is memoized on flask.g. Across requests a
+    snapshot of the user's columns is kept for `ttl` seconds and re-attached
+    to the session as a persistent instance, so the users table is not read.
+    Writers must call invalidate() after changing or deleting a user; other
+    workers see the change once their snapshot expires, so the TTL is kept
+    short: it bounds how long a deleted user or a changed password is
+    honoured elsewhere.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 5
+        self.max_entries = 10000
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', 5)
+        self.max_entries = app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 10000)
+        app.extensions['identity_cache'] = self
+
+    def load_user(self, user_id):
+        """Return the User for user_id (or None), avoiding a query when possible"""
+        cached = g.get('identity_user')
+        if cached is not None and cached[0] == user_id:
+            return cached[1]
+
+        user = self._from_snapshot(user_id)
+        if user is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self._remember(user)
+
+        g.identity_user = (user_id, user)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._snapshots.pop(user_id, None)
+        cached = g.get('identity_user')
+        if cached is not None and cached[0] == user_id:
+            g.pop('identity_user')
+
+    def _remember(self, user):
+        values = {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(User).column_attrs if attr.key not in EXCLUDED_COLUMNS
+        }
+        with self._lock:
+            if len(self._snapshots) >= self.max_entries:
+                self._snapshots.clear()
+            self._snapshots[user.id] = (time.monotonic() + self.ttl, values)
+
+    def _from_snapshot(self, user_id):
+        with self._lock:
+            entry = self._snapshots.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+
+        # Already loaded in this session: reuse it rather than attaching a twin
+        existing = db.session.identity_map.get(identity_key(User, user_id))
+        if existing is not None:
+            return existing
+
+        user = inspect(User).class_manager.new_instance()
+        for key, value in entry[1].items():
+            setattr(user, key, value)
+        # Treat the snapshot as freshly loaded so attaching it issues no SQL; excluded columns load on access
+        make_transient_to_detached(user)
+        db.session.add(user)
+        return user
+
+
+identity_cache = IdentityCache()
@@ -0,0 +1,323 @@
+import hmac
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Fixed-bucket histogram keyed by label values; observe() is a bisect and three adds under a lock"""
+
+    def __init__(self, name, help, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}')
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le)} {count}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {count}')
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *labels):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        lines.extend(f'{self.name}{_labels(self.label_names, labels)} {_number(value)}' for labels, value in snapshot)
+        return lines
+
+
+class GaugeCallback:
+    """Gauge read at scrape time; fn returns a number, or a dict of label value -> number"""
+
+    def __init__(self, name, help, fn, label=None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Failed to read gauge {self.name}: {e}")
+            return lines
+        if isinstance(value, dict):
+            lines.extend(f'{self.name}{_labels((self.label,), (key,))} {_number(v)}' for key, v in sorted(value.items()))
+        else:
+            lines.append(f'{self.name} {_number(value)}')
+        return lines
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of in-flight requests and prints the hottest ones for requests over a threshold.
+
+    Off unless PROFILE_SLOW_REQUEST_MS is set. One sampler thread per process
+    walks sys._current_frames() every `interval` seconds, so the cost is paid
+    by that thread rather than by the requests being profiled.
+    """
+
+    def __init__(self, threshold_ms=0, interval=0.005, top=5, depth=30):
+        self.threshold_ms = threshold_ms
+        self.interval = interval
+        self.top = top
+        self.depth = depth
+        self._active = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def begin(self):
+        if self._pid != os.getpid():
+            self._start()
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def end(self, elapsed, description):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples and elapsed * 1000 >= self.threshold_ms:
+            self._dump(elapsed, description, samples)
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._active = {}
+            self._pid = os.getpid()
+        threading.Thread(target=self._sample, name='slow-request-profiler', daemon=True).start()
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    stack = []
+                    while frame is not None and len(stack) < self.depth:
+                        code = frame.f_code
+                        stack.append(f"{code.co_filename}:{frame.f_lineno} {code.co_name}")
+                        frame = frame.f_back
+                    if stack:
+                        samples[tuple(stack)] += 1
+
+    def _dump(self, elapsed, description, samples):
+        total = sum(samples.values())
+        lines = [f"Slow request: {description} took {elapsed * 1000:.0f} ms ({total} samples)"]
+        for stack, count in samples.most_common(self.top):
+            lines.append(f"  {count / total:.0%} of samples:")
+            # Outermost frame first, like a traceback
+            lines.extend(f"    {frame}" for frame in reversed(stack))
+        print('\n'.join(lines))
+
+
+class Instrumentation:
+    """Request, database and outbound-call metrics exposed in Prometheus text format at /metrics"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.token = None
+        self.profiler = None
+        self._databases = {}
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Request latency by route', ('method', 'route', 'status'))
+        self.request_queries = Histogram(
+            'http_request_db_queries', 'SQL statements executed per request', ('route',), QUERY_COUNT_BUCKETS)
+        self.request_db_time = Histogram(
+            'http_request_db_seconds', 'Time spent in SQL per request', ('route',))
+        self.db_queries = CounterMetric(
+            'db_queries_total', 'SQL statements executed, including background threads', ('database',))
+        self.db_time = CounterMetric(
+            'db_query_seconds_total', 'Time spent executing SQL', ('database',))
+        self.outbound_duration = Histogram(
+            'outbound_request_duration_seconds', 'Outbound provider call latency', ('host', 'outcome'))
+        self.gauges = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.token = app.config.get('METRICS_TOKEN')
+        threshold = app.config.get('PROFILE_SLOW_REQUEST_MS', 0)
+        self.profiler = SlowRequestProfiler(
+            threshold, app.config.get('PROFILE_SAMPLE_INTERVAL', 0.005)
+        ) if threshold else None
+        app.extensions['instrumentation'] = self
+        if not self.enabled:
+            return
+        if not self.token:
+            print("METRICS_TOKEN is not set; /metrics only answers when the app runs in debug mode")
+
+        _listen_for_queries(self)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def register_gauge(self, name, help, fn, label=None):
+        self.gauges.append(GaugeCallback(name, help, fn, label))
+
+    @contextmanager
+    def outbound(self, host):
+        """Time one outbound call; the outcome label is 'ok' or the exception class name"""
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            self.outbound_duration.observe(time.perf_counter() - started, host, outcome)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = 0
+        g.metrics_db_time = 0.0
+        if self.profiler is not None:
+            self.profiler.begin()
+
+    def _after_request(self, response):
+        self._observe(response.status_code)
+        return response
+
+    def _teardown_request(self, exception=None):
+        # Unhandled exceptions skip after_request
+        if exception is not None:
+            self._observe(500)
+
+    def _observe(self, status):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        # The URL rule, not the path, so IDs and tokens don't become label values
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        self.request_duration.observe(elapsed, request.method, route, str(status))
+        self.request_queries.observe(g.get('metrics_queries', 0), route)
+        self.request_db_time.observe(g.get('metrics_db_time', 0.0), route)
+        if self.profiler is not None:
+            self.profiler.end(elapsed, f"{request.method} {route} -> {status}")
+
+    def _database_label(self, engine):
+        label = self._databases.get(engine)
+        if label is None:
+            url = engine.url
+            label = self._databases[engine] = os.path.basename(url.database or '') or url.host or url.drivername
+        return label
+
+    def _query_finished(self, conn, elapsed):
+        database = self._database_label(conn.engine)
+        self.db_queries.inc(1, database)
+        self.db_time.inc(elapsed, database)
+        if has_request_context() and 'metrics_started' in g:
+            g.metrics_queries += 1
+            g.metrics_db_time += elapsed
+
+    def metrics_view(self):
+        if not self.token:
+            # Per-route and per-tenant counters are not public; without a token only debug runs serve them
+            if not current_app.debug:
+                return Response('Set METRICS_TOKEN to enable /metrics\n', status=403)
+        elif not hmac.compare_digest(
+            request.headers.get('Authorization', '').encode(), f'Bearer {self.token}'.encode()
+        ):
+            return Response('Unauthorized\n', status=401)
+        lines = []
+        for metric in (self.request_duration, self.request_queries, self.request_db_time,
+                       self.db_queries, self.db_time, self.outbound_duration, *self.gauges):
+            lines.extend(metric.render())
+        return Response('\n'.join(lines) + '\n', content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+_query_listeners = []
+
+
+def _listen_for_queries(instrumentation):
+    """Engine-wide cursor hooks, installed once per process for every engine (main and events binds)"""
+    if _query_listeners:
+        _query_listeners[0] = instrumentation
+        return
+    _query_listeners.append(instrumentation)
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['metrics_query_started'].pop()
+        _query_listeners[0]._query_finished(conn, time.perf_counter() - started)
+
+    @event.listens_for(Engine, 'handle_error')
+    def _handle_error(context):
+        stack = context.connection.info.get('metrics_query_started') if context.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,95 @@
+"""JSON encoding for API responses, request bodies and stored payloads.
+
+orjson is used when it is installed (pip install orjson), the standard
+library otherwise. Both paths write dates and datetimes as ISO 8601, so
+serializers can put datetime objects straight into their dicts instead of
+calling .isoformat() per row.
+"""
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def _orjson_options(sort_keys=False, indent=False, newline=False):
+    option = orjson.OPT_NON_STR_KEYS
+    if sort_keys:
+        option |= orjson.OPT_SORT_KEYS
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    if newline:
+        option |= orjson.OPT_APPEND_NEWLINE
+    return option
+
+
+def dumps_bytes(obj, sort_keys=False):
+    """Compact UTF-8 JSON"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default, option=_orjson_options(sort_keys))
+        except TypeError:
+            # orjson rejects what the stdlib accepts, e.g. integers past 64 bits
+            pass
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj, sort_keys=False):
+    return dumps_bytes(obj, sort_keys).decode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when available; jsonify() and request.get_json() both use it"""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        sort_keys = kwargs.get('sort_keys', self.sort_keys)
+        try:
+            return orjson.dumps(obj, default=_default, option=_orjson_options(sort_keys, kwargs.get('indent'))).decode()
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        try:
+            # Bytes straight into the response; no str round trip
+            body = orjson.dumps(obj, default=_default, option=_orjson_options(self.sort_keys, pretty, newline=True))
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
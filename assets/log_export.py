@@ -0,0 +1,65 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+
+from src.services.json_provider import dumps
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Flush encoded output in pieces of roughly this size rather than per row
+BUFFER_SIZE = 64 * 1024
+
+
+def iter_ndjson(records):
+    """Encode records as newline-delimited JSON, yielding buffered chunks"""
+    buffer = []
+    size = 0
+    for record in records:
+        line = dumps(record) + '\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_csv(records):
+    """Encode records as CSV with a header taken from the first record"""
+    output = io.StringIO()
+    writer = None
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(output, fieldnames=list(record.keys()), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow({key: _csv_value(value) for key, value in record.items()})
+        if output.tell() >= BUFFER_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    if output.tell():
+        yield output.getvalue()
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_gzip(chunks):
+    """Compress a stream of text chunks into a single gzip body"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
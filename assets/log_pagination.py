@@ -0,0 +1,68 @@
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from src.models.user import WebhookLog
+
+
+def encode_cursor(log):
+    """Cursor pointing just past the given log: '<created_at>,<id>'"""
+    return f"{log.created_at.isoformat()},{log.id}"
+
+
+def decode_cursor(cursor):
+    """Parse an 'after' cursor. Raises ValueError when malformed"""
+    created_at, _, log_id = cursor.rpartition(',')
+    return datetime.fromisoformat(created_at), int(log_id)
+
+
+def keyset_page(query, after, limit):
+    """Return (logs, next_cursor) for the page that follows `after` in created_at desc order"""
+    if after:
+        created_at, log_id = decode_cursor(after)
+        query = query.filter(tuple_(WebhookLog.created_at, WebhookLog.id) < (created_at, log_id))
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.order_by(
+        WebhookLog.created_at.desc(), WebhookLog.id.desc()
+    ).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+class CountCache:
+    """Short-lived cache of webhook log totals so COUNT(*) doesn't run on every page"""
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+
+        value = compute()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+webhook_log_counts = CountCache()
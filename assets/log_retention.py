@@ -0,0 +1,234 @@
+import atexit
+import fcntl
+import gzip
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from src.models.user import WebhookLog
+from src.models.events_db import events_session
+from src.services.payload_store import payload_store, log_record
+from src.services.json_provider import dumps, loads
+from src.services.log_pagination import webhook_log_counts
+from src.services.webhook_dedupe import webhook_dedupe
+
+
+class LogRetention:
+    """Moves WebhookLog rows older than the hot window into gzip NDJSON archives.
+
+    Archives are bucketed as <archive_dir>/<service_name>/<YYYY-MM-DD>.ndjson.gz.
+    Rows are written to the archive before they are deleted, so a crash between
+    the two steps can duplicate a chunk in the archive but never loses one.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.retention_days = 30
+        self.archive_dir = None
+        self.chunk_size = 1000
+        self.chunk_pause = 0.05
+        self.interval = 0
+        self._thread = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.retention_days = app.config.get('WEBHOOK_LOG_RETENTION_DAYS', 30)
+        self.archive_dir = app.config.get(
+            'WEBHOOK_LOG_ARCHIVE_DIR', os.path.join(app.root_path, 'database', 'archive')
+        )
+        self.chunk_size = app.config.get('WEBHOOK_LOG_ARCHIVE_CHUNK_SIZE', 1000)
+        self.chunk_pause = app.config.get('WEBHOOK_LOG_ARCHIVE_CHUNK_PAUSE', 0.05)
+        self.interval = app.config.get('WEBHOOK_LOG_ARCHIVE_INTERVAL', 0)
+        app.extensions['log_retention'] = self
+
+        @app.cli.command('archive-webhook-logs')
+        def archive_webhook_logs_command():
+            """Archive webhook logs older than the retention window."""
+            print(f"Archived {self.archive_expired()} webhook logs")
+
+    def cutoff(self, now=None):
+        """Oldest created_at still kept in the database"""
+        return (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+
+    def start(self):
+        """Run archive_expired() and the dedupe receipt prune every `interval` seconds in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='webhook-log-retention', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    # Another worker holding the sweep lock is already doing this round
+                    self.archive_expired(wait=False)
+                except Exception as e:
+                    events_session.rollback()
+                    print(f"Webhook log archival failed: {e}")
+                finally:
+                    events_session.remove()
+                # Receipts past the dedupe TTL are dead weight; cleared here, off the request path
+                webhook_dedupe.prune()
+
+    @contextmanager
+    def _sweep_lock(self, wait=True):
+        """Exclusive flock on <archive_dir>/.archive.lock; yields False if busy and not waiting.
+
+        Every worker runs the retention thread. Without this, two processes
+        archive the same rows twice and interleave appends to one day file.
+        """
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(os.path.join(self.archive_dir, '.archive.lock'), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def archive_expired(self, now=None, wait=True):
+        """Archive and delete expired rows in chunks, one process at a time. Needs an app context"""
+        with self._sweep_lock(wait) as locked:
+            if not locked:
+                return 0
+            return self._archive_expired(self.cutoff(now))
+
+    def _archive_expired(self, cutoff):
+        archived = 0
+        while not self._stop.is_set():
+            logs = events_session.query(WebhookLog).filter(WebhookLog.created_at < cutoff).order_by(
+                WebhookLog.created_at, WebhookLog.id
+            ).limit(self.chunk_size).all()
+            if not logs:
+                break
+
+            self._write_archive(logs)
+
+            # Each chunk is its own short write transaction
+            ids = [log.id for log in logs]
+            events_session.query(WebhookLog).filter(WebhookLog.id.in_(ids)).delete(synchronize_session=False)
+            payload_store.delete(ids)
+            events_session.commit()
+            archived += len(ids)
+
+            if self.chunk_pause:
+                time.sleep(self.chunk_pause)
+
+        if archived:
+            webhook_log_counts.invalidate()
+        return archived
+
+    def _archive_path(self, service_name, day):
+        return os.path.join(self.archive_dir, service_name, f"{day.isoformat()}.ndjson.gz")
+
+    def _write_archive(self, logs):
+        payloads = payload_store.load(logs)
+        buckets = defaultdict(list)
+        for log in logs:
+            buckets[(log.service_name, log.created_at.date())].append(log)
+
+        for (service_name, day), bucket in buckets.items():
+            path = self._archive_path(service_name, day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Appending adds a gzip member; gzip.open reads members back to back
+            with gzip.open(path, 'at', encoding='utf-8') as archive:
+                for log in bucket:
+                    archive.write(dumps(log_record(log, payloads[log.id])) + '\n')
+
+    def read_archive(self, user_id, service_name=None, since=None, until=None, before=None, limit=100):
+        """Archived records for a user, newest first.
+
+        `since`/`until` bound created_at; `before` is a (created_at, id) keyset position.
+        """
+        services = [service_name] if service_name else self._archived_services()
+        until_day = (until or self.cutoff()).date()
+        if before:
+            until_day = min(until_day, before[0].date())
+        since_day = since.date() if since else self._oldest_archived_day(services)
+        if since_day is None:
+            return []
+
+        results = []
+        day = until_day
+        while day >= since_day and len(results) < limit:
+            records = []
+            for service in services:
+                path = self._archive_path(service, day)
+                if os.path.exists(path):
+                    records.extend(self._read_day(path, user_id, since, until, before))
+
+            records.sort(key=lambda r: (r['created_at'], r['id']), reverse=True)
+            results.extend(records[:limit - len(results)])
+            day -= timedelta(days=1)
+        return results
+
+    def iter_archive(self, user_id, service_name=None, since=None, until=None):
+        """Yield archived records for a user, oldest first, one day file at a time"""
+        services = [service_name] if service_name else self._archived_services()
+        day = since.date() if since else self._oldest_archived_day(services)
+        if day is None:
+            return
+
+        until_day = (until or self.cutoff()).date()
+        while day <= until_day:
+            records = []
+            for service in services:
+                path = self._archive_path(service, day)
+                if os.path.exists(path):
+                    records.extend(self._read_day(path, user_id, since, until, None))
+
+            records.sort(key=lambda r: (r['created_at'], r['id']))
+            yield from records
+            day += timedelta(days=1)
+
+    def _read_day(self, path, user_id, since, until, before):
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                record = loads(line)
+                if record['user_id'] != user_id:
+                    continue
+                created_at = datetime.fromisoformat(record['created_at'])
+                if since and created_at < since:
+                    continue
+                if until and created_at >= until:
+                    continue
+                if before and (created_at, record['id']) >= before:
+                    continue
+                yield record
+
+    def _archived_services(self):
+        if not os.path.isdir(self.archive_dir):
+            return []
+        # Service directories only; the sweep lock file lives alongside them
+        return sorted(name for name in os.listdir(self.archive_dir)
+                      if os.path.isdir(os.path.join(self.archive_dir, name)))
+
+    def _oldest_archived_day(self, services):
+        days = []
+        for service in services:
+            directory = os.path.join(self.archive_dir, service)
+            if os.path.isdir(directory):
+                days.extend(name.split('.')[0] for name in os.listdir(directory))
+        return datetime.fromisoformat(min(days)).date() if days else None
+
+
+log_retention = LogRetention()
@@ -0,0 +1,135 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBucketBackend:
+    """Token buckets held in this process, LRU-evicted beyond `max_keys`"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, now):
+        """Spend one token. Returns seconds to wait, or 0 when allowed"""
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            # Idle keys drift to the front and are dropped first
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class SQLiteBucketBackend:
+    """Token buckets in a SQLite file so several workers on one host share counters"""
+
+    def __init__(self, path, max_keys=100000):
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._takes = 0
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS login_buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_login_buckets_updated ON login_buckets (updated)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, capacity, now):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM login_buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute('INSERT OR REPLACE INTO login_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+
+            # Trim the least recently touched keys now and then
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                conn.execute(
+                    'DELETE FROM login_buckets WHERE key IN (SELECT key FROM login_buckets '
+                    'ORDER BY updated DESC LIMIT -1 OFFSET ?)', (self.max_keys,)
+                )
+            conn.execute('COMMIT')
+            return wait
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+
+class LoginThrottle:
+    """Token-bucket limiter for login attempts, keyed by client IP and by normalized email"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.ip_rate = 20 / 60
+        self.ip_burst = 20
+        self.email_rate = 5 / 60
+        self.email_burst = 5
+        self.backend = MemoryBucketBackend()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LOGIN_THROTTLE_ENABLED', True)
+        self.ip_rate = app.config.get('LOGIN_THROTTLE_IP_PER_MINUTE', 20) / 60
+        self.ip_burst = app.config.get('LOGIN_THROTTLE_IP_BURST', 20)
+        self.email_rate = app.config.get('LOGIN_THROTTLE_EMAIL_PER_MINUTE', 5) / 60
+        self.email_burst = app.config.get('LOGIN_THROTTLE_EMAIL_BURST', 5)
+        max_keys = app.config.get('LOGIN_THROTTLE_MAX_KEYS', 100000)
+
+        backend = app.config.get('LOGIN_THROTTLE_BACKEND', 'memory')
+        if backend.startswith('sqlite:///'):
+            self.backend = SQLiteBucketBackend(backend[len('sqlite:///'):], max_keys)
+        else:
+            self.backend = MemoryBucketBackend(max_keys)
+        app.extensions['login_throttle'] = self
+
+    @staticmethod
+    def normalize_email(email):
+        return (email or '').lower().strip()
+
+    def check(self, ip, email):
+        """Seconds the client must wait, or 0 when the attempt may proceed"""
+        if not self.enabled:
+            return 0
+
+        now = time.time()
+        # An IP over its limit is rejected without charging the account's bucket
+        wait = self.backend.take(f"ip:{ip}", self.ip_rate, self.ip_burst, now)
+        if wait:
+            return wait
+
+        email = self.normalize_email(email)
+        if email:
+            return self.backend.take(f"email:{email}", self.email_rate, self.email_burst, now)
+        return 0
+
+
+login_throttle = LoginThrottle()
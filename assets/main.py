@@ -3,37 +3,275 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
+# Time imports before anything below pulls them in
+if __name__ == '__main__' and '--profile-startup' in sys.argv:
+    from src.services.startup_profile import StartupProfiler
+    startup_profiler = StartupProfiler()
+    startup_profiler.profile_imports()
+
+import threading
+
 from flask import Flask, send_from_directory
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from src.models.user import db
+from src.services.storage import configure_storage
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.integrations import integrations_bp
 from src.routes.webhooks import webhooks_bp
+from src.services.webhook_ingest import webhook_ingest
+from src.services.webhook_dedupe import webhook_dedupe
+from src.services.webhook_signatures import webhook_signatures
+from src.services.payload_store import payload_store
+from src.services.tenant_index import tenant_index
+from src.models.events_db import init_events_db
+from src.models.migrations import init_migrations, upgrade
+from src.services.log_retention import log_retention
+from src.services.webhook_metrics import webhook_metrics
+from src.services.http_client import http_client
+from src.services.circuit_breaker import circuit_breakers
+from src.services.health_checks import integration_test_cache
+from src.services.twilio_clients import twilio_clients
+from src.services.event_dispatcher import event_dispatcher
+from src.services.password_hashing import password_hasher
+from src.services.login_throttle import login_throttle
+from src.services.identity_cache import identity_cache
+from src.services.startup_profile import no_profile
+from src.services.static_assets import static_manifest
+from src.services.instrumentation import instrumentation
+from src.services.json_provider import FastJSONProvider
+
+
+def create_app(config=None, profiler=None):
+    """Build the app without touching the database or starting threads.
+
+    Schema changes are applied with `flask upgrade-db`, demo data with
+    `flask seed-demo`; background workers start on each process's first request.
+    """
+    step = profiler.step if profiler else no_profile
+
+    with step('flask app'):
+        app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+        app.config['SECRET_KEY'] = 'peakwave_digital_solutions_secret_key_2025'
+        # jsonify() and request.get_json() go through orjson when it is installed; datetimes encode as ISO 8601
+        app.json = FastJSONProvider(app)
+        app.json.sort_keys = False
+
+        # Enable CORS for all routes
+        CORS(app, supports_credentials=True)
+
+    with step('blueprints'):
+        app.register_blueprint(user_bp, url_prefix='/api')
+        app.register_blueprint(auth_bp, url_prefix='/api/auth')
+        app.register_blueprint(integrations_bp, url_prefix='/api')
+        app.register_blueprint(webhooks_bp, url_prefix='/api')
+
+    with step('database'):
+        # Database configuration: DATABASE_URL and pool settings come from the environment
+        configure_storage(app, os.path.join(os.path.dirname(__file__), 'database', 'app.db'))
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config.update(config or {})
+        db.init_app(app)
+        init_events_db(app)
+        init_migrations(app)
+
+    with step('webhook ingest'):
+        # Webhook ingest: queue WebhookLog rows and group-commit them from a background writer
+        app.config.setdefault('WEBHOOK_INGEST_ASYNC', os.environ.get('WEBHOOK_INGEST_ASYNC', '1') == '1')
+        app.config.setdefault('WEBHOOK_INGEST_BATCH_SIZE', int(os.environ.get('WEBHOOK_INGEST_BATCH_SIZE', 200)))
+        app.config.setdefault('WEBHOOK_INGEST_FLUSH_INTERVAL', float(os.environ.get('WEBHOOK_INGEST_FLUSH_INTERVAL', 0.25)))
+        app.config.setdefault('WEBHOOK_INGEST_MAX_QUEUE', int(os.environ.get('WEBHOOK_INGEST_MAX_QUEUE', 10000)))
+        webhook_ingest.init_app(app)
+
+        # Tenant index: each worker rebuilds it after TENANT_INDEX_TTL seconds to see other workers' integration edits
+        app.config.setdefault('TENANT_INDEX_TTL', int(os.environ.get('TENANT_INDEX_TTL', 30)))
+        tenant_index.init_app(app)
+
+        # Webhook signatures: checked against keys cached in the tenant index before anything is parsed or written
+        app.config.setdefault('WEBHOOK_SIGNATURES', os.environ.get('WEBHOOK_SIGNATURES', '1') == '1')
+        app.config.setdefault('WEBHOOK_REQUIRE_SIGNATURES', os.environ.get('WEBHOOK_REQUIRE_SIGNATURES', '0') == '1')
+        app.config.setdefault('WEBHOOK_PUBLIC_URL', os.environ.get('WEBHOOK_PUBLIC_URL'))
+        webhook_signatures.init_app(app)
+
+        # Webhook dedupe: provider retries are answered from an LRU of recent keys, backed by webhook_receipts
+        app.config.setdefault('WEBHOOK_DEDUPE', os.environ.get('WEBHOOK_DEDUPE', '1') == '1')
+        app.config.setdefault('WEBHOOK_DEDUPE_TTL', int(os.environ.get('WEBHOOK_DEDUPE_TTL', 86400)))
+        app.config.setdefault('WEBHOOK_DEDUPE_CACHE_SIZE', int(os.environ.get('WEBHOOK_DEDUPE_CACHE_SIZE', 100000)))
+        webhook_dedupe.init_app(app)
+
+        # Webhook payloads: stored compressed in webhook_log_payloads; zstd needs the zstandard package
+        app.config.setdefault('WEBHOOK_PAYLOAD_CODEC', os.environ.get('WEBHOOK_PAYLOAD_CODEC', 'zlib'))
+        app.config.setdefault('WEBHOOK_PAYLOAD_DICT_DIR', os.environ.get(
+            'WEBHOOK_PAYLOAD_DICT_DIR', os.path.join(os.path.dirname(__file__), 'database', 'payload-dicts')
+        ))
+        payload_store.init_app(app)
+
+    with step('log retention'):
+        # Webhook log retention: rows older than the hot window move to gzip NDJSON archives
+        app.config.setdefault('WEBHOOK_LOG_RETENTION_DAYS', int(os.environ.get('WEBHOOK_LOG_RETENTION_DAYS', 30)))
+        app.config.setdefault('WEBHOOK_LOG_ARCHIVE_DIR', os.environ.get(
+            'WEBHOOK_LOG_ARCHIVE_DIR', os.path.join(os.path.dirname(__file__), 'database', 'archive')
+        ))
+        app.config.setdefault('WEBHOOK_LOG_ARCHIVE_INTERVAL', int(os.environ.get('WEBHOOK_LOG_ARCHIVE_INTERVAL', 3600)))
+        log_retention.init_app(app)
+
+    with step('webhook stats'):
+        # Webhook stats: per-minute counters upserted into the webhook_stats rollup table
+        app.config.setdefault('WEBHOOK_STATS_FLUSH_INTERVAL', int(os.environ.get('WEBHOOK_STATS_FLUSH_INTERVAL', 10)))
+        webhook_metrics.init_app(app)
+
+    with step('outbound http'):
+        # Outbound HTTP: keep-alive pools per host, separate connect/read timeouts, retries for idempotent calls
+        app.config.setdefault('OUTBOUND_POOL_CONNECTIONS', int(os.environ.get('OUTBOUND_POOL_CONNECTIONS', 32)))
+        app.config.setdefault('OUTBOUND_POOL_MAXSIZE', int(os.environ.get('OUTBOUND_POOL_MAXSIZE', 10)))
+        app.config.setdefault('OUTBOUND_CONNECT_TIMEOUT', float(os.environ.get('OUTBOUND_CONNECT_TIMEOUT', 3.05)))
+        app.config.setdefault('OUTBOUND_READ_TIMEOUT', float(os.environ.get('OUTBOUND_READ_TIMEOUT', 10)))
+        app.config.setdefault('OUTBOUND_MAX_RETRIES', int(os.environ.get('OUTBOUND_MAX_RETRIES', 2)))
+        http_client.init_app(app)
+        app.config.setdefault('INTEGRATION_TEST_DEADLINE', float(os.environ.get('INTEGRATION_TEST_DEADLINE', 12)))
+
+    with step('integration health checks'):
+        # Integration health checks: cached results per config fingerprint, per-host circuit breakers
+        app.config.setdefault('INTEGRATION_TEST_CACHE_TTL', int(os.environ.get('INTEGRATION_TEST_CACHE_TTL', 60)))
+        app.config.setdefault('CIRCUIT_FAILURE_THRESHOLD', int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5)))
+        app.config.setdefault('CIRCUIT_RESET_TIMEOUT', int(os.environ.get('CIRCUIT_RESET_TIMEOUT', 30)))
+        integration_test_cache.init_app(app)
+        circuit_breakers.init_app(app)
+
+        # Twilio: LRU of SDK clients shared by the test endpoint and any SMS/call sending path
+        app.config.setdefault('TWILIO_CLIENT_CACHE_SIZE', int(os.environ.get('TWILIO_CLIENT_CACHE_SIZE', 64)))
+        twilio_clients.init_app(app)
+
+    with step('event dispatcher'):
+        # Outbound events: fan domain events out to Zapier/Make webhooks from a worker pool
+        app.config.setdefault('DISPATCH_WORKERS', int(os.environ.get('DISPATCH_WORKERS', 8)))
+        app.config.setdefault('DISPATCH_PER_DESTINATION_CONCURRENCY', int(os.environ.get('DISPATCH_PER_DESTINATION_CONCURRENCY', 2)))
+        app.config.setdefault('DISPATCH_BATCH_SIZE', int(os.environ.get('DISPATCH_BATCH_SIZE', 25)))
+        app.config.setdefault('DISPATCH_MAX_ATTEMPTS', int(os.environ.get('DISPATCH_MAX_ATTEMPTS', 5)))
+        # Per-destination queue cap; overflow is dead-lettered so a dead receiver can't exhaust memory
+        app.config.setdefault('DISPATCH_MAX_PER_DESTINATION', int(os.environ.get('DISPATCH_MAX_PER_DESTINATION', 1000)))
+        app.config.setdefault('DISPATCH_DESTINATION_IDLE', int(os.environ.get('DISPATCH_DESTINATION_IDLE', 300)))
+        event_dispatcher.init_app(app)
+
+    with step('auth'):
+        # Password hashing: runs in a process pool; changing the method upgrades hashes at next login
+        app.config.setdefault('PASSWORD_HASH_METHOD', os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'))
+        app.config.setdefault('PASSWORD_HASH_WORKERS', int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)))
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64)))
+        password_hasher.init_app(app)
+
+        # Login throttling: token buckets per IP and per email; 'sqlite:///path' shares them across workers
+        app.config.setdefault('LOGIN_THROTTLE_BACKEND', os.environ.get('LOGIN_THROTTLE_BACKEND', 'memory'))
+        app.config.setdefault('LOGIN_THROTTLE_IP_PER_MINUTE', int(os.environ.get('LOGIN_THROTTLE_IP_PER_MINUTE', 20)))
+        app.config.setdefault('LOGIN_THROTTLE_EMAIL_PER_MINUTE', int(os.environ.get('LOGIN_THROTTLE_EMAIL_PER_MINUTE', 5)))
+        login_throttle.init_app(app)
+
+        # Reverse proxy: trust this many hops of X-Forwarded-For/-Proto/-Host, so remote_addr is the client
+        # (one throttle bucket per client, not per proxy) and request.url is what Twilio signed
+        app.config.setdefault('TRUSTED_PROXY_COUNT', int(os.environ.get('TRUSTED_PROXY_COUNT', 0)))
+        if app.config['TRUSTED_PROXY_COUNT']:
+            hops = app.config['TRUSTED_PROXY_COUNT']
+            app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+        # Identity cache: memoize the session user per request and for a short TTL across requests;
+        # the TTL bounds how long other workers honour a deleted user or an old password
+        app.config.setdefault('IDENTITY_CACHE_TTL', int(os.environ.get('IDENTITY_CACHE_TTL', 5)))
+        identity_cache.init_app(app)
+
+    with step('static manifest'):
+        # Static files: hashed, fingerprinted and precompressed once; STATIC_MANIFEST=0 serves from disk (editing locally)
+        app.config.setdefault('STATIC_MANIFEST', os.environ.get('STATIC_MANIFEST', '1') == '1')
+        # Compressed variants by content hash; `flask static-manifest` fills it at deploy so workers only read it
+        app.config.setdefault('STATIC_MANIFEST_CACHE_DIR', os.environ.get(
+            'STATIC_MANIFEST_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'database', 'static-cache')
+        ))
+        static_manifest.init_app(app)
+
+    with step('instrumentation'):
+        # Metrics: per-route latency, SQL counts and outbound latency at /metrics; counts are per worker process
+        app.config.setdefault('METRICS_ENABLED', os.environ.get('METRICS_ENABLED', '1') == '1')
+        # Required outside debug mode: /metrics exposes per-route and per-tenant counters
+        app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+        # Opt-in: print the hottest sampled stacks of requests slower than this many milliseconds
+        app.config.setdefault('PROFILE_SLOW_REQUEST_MS', int(os.environ.get('PROFILE_SLOW_REQUEST_MS', 0)))
+        instrumentation.init_app(app)
+        register_gauges()
+
+    with step('routes and commands'):
+        register_background_workers(app)
+        register_commands(app)
+        register_routes(app)
+
+    return app
+
+
+def register_background_workers(app):
+    """Start writer/flush/dispatch threads in each worker process on its first request.
+
+    Threads don't survive fork, so starting them at import time in a pre-fork
+    master would leave the workers without them.
+    """
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_background_workers():
+        if app.extensions.get('workers_pid') == os.getpid():
+            return
+        with lock:
+            if app.extensions.get('workers_pid') == os.getpid():
+                return
+            if webhook_ingest.enabled:
+                webhook_ingest.start()
+            if webhook_metrics.flush_interval:
+                webhook_metrics.start()
+            if log_retention.interval:
+                log_retention.start()
+            if event_dispatcher.enabled:
+                event_dispatcher.start()
+            # Load integrations in the background so the first webhook doesn't pay for the scan
+            tenant_index.refresh_async()
+            app.extensions['workers_pid'] = os.getpid()
+
+
+def register_gauges():
+    if instrumentation.gauges:
+        return
+    instrumentation.register_gauge(
+        'webhook_ingest_queue_depth', 'Webhook logs waiting for the batch writer', webhook_ingest.pending)
+    instrumentation.register_gauge(
+        'webhook_ingest_dropped', 'Webhook logs the batch writer gave up on after retries',
+        lambda: webhook_ingest.dropped)
+    instrumentation.register_gauge(
+        'webhook_duplicates', 'Provider retries dropped by the dedupe cache or receipts table',
+        lambda: webhook_dedupe.duplicates)
+    instrumentation.register_gauge(
+        'webhook_signature_rejections', 'Webhooks rejected for a missing or invalid signature',
+        lambda: webhook_signatures.rejected)
+    instrumentation.register_gauge(
+        'webhook_unsigned_accepts', 'Webhooks accepted unsigned because their integration has no webhook_secret',
+        lambda: webhook_signatures.unsigned)
+    instrumentation.register_gauge(
+        'event_dispatch_pending', 'Outbound events waiting, by stage', event_dispatcher.pending, label='stage')
+    instrumentation.register_gauge(
+        'event_dispatch_overflowed', 'Outbound events dead-lettered because their destination queue was full',
+        lambda: event_dispatcher.overflowed)
+    instrumentation.register_gauge(
+        'outbound_pool', 'Outbound connection pool counters', http_client.stats, label='stat')
+    instrumentation.register_gauge(
+        'circuit_breaker_open', 'Hosts whose circuit is open or half-open',
+        lambda: {host: int(state != 'closed') for host, state in circuit_breakers.states().items()}, label='host')
+
+
+def register_commands(app):
+    @app.cli.command('seed-demo')
+    def seed_demo_command():
+        """Create the demo user if the database has no users."""
+        from src.models.user import User
+        if User.query.first():
+            print("Users already exist; nothing to seed")
+            return
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'peakwave_digital_solutions_secret_key_2025'
-
-# Enable CORS for all routes
-CORS(app, supports_credentials=True)
-
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(integrations_bp, url_prefix='/api')
-app.register_blueprint(webhooks_bp, url_prefix='/api')
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-with app.app_context():
-    db.create_all()
-    
-    # Create test user if none exists
-    from src.models.user import User
-    if not User.query.first():
         test_user = User(
             email='test@peakwave.com',
             first_name='Test',
@@ -44,26 +282,53 @@ with app.app_context():
         db.session.commit()
         print("Created test user: test@peakwave.com / TestPassword123")
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+
+def register_routes(app):
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if static_manifest.enabled:
+            asset, immutable = static_manifest.lookup(path) if path else (None, False)
+            if asset is None:
+                asset, immutable = static_manifest.lookup('index.html')
+            if asset is None:
+                return "index.html not found", 404
+            return static_manifest.response(asset, immutable)
+
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+            return "Static folder not configured", 404
+
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
+
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        return {'status': 'healthy', 'service': 'Peakwave Members Backend'}, 200
+
+
+def __getattr__(name):
+    # `gunicorn src.main:app` keeps working; importing create_app alone builds nothing
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    return {'status': 'healthy', 'service': 'Peakwave Members Backend'}, 200
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    if '--profile-startup' in sys.argv:
+        app = create_app(profiler=startup_profiler)
+        print(startup_profiler.report())
+        sys.exit(0)
 
+    app = create_app()
+    # The development server keeps its schema current; production runs `flask upgrade-db` once per deploy
+    with app.app_context():
+        upgrade()
+    app.run(host='0.0.0.0', port=5000, debug=True)
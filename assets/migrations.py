@@ -0,0 +1,131 @@
+"""Versioned schema migrations.
+
+Each migration runs once per database bind, in version order, and is
+recorded in that database's schema_migrations table. Apply them with
+
+    flask --app src.main:create_app upgrade-db
+
+New schema changes get a new, higher version here; never edit one that
+has shipped.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+from sqlalchemy.orm import Session
+
+from src.models.user import Integration, WebhookLog, db
+from src.models.events_db import EVENTS_BIND, events_engine
+from src.models.webhook_log_indexes import ensure_indexes
+from src.models.webhook_stats import WebhookStat
+from src.models.outbound_events import OutboundDeadLetter
+from src.models.webhook_receipts import WebhookReceipt
+from src.models.webhook_payloads import WebhookPayload
+from src.services.payload_store import payload_store
+from src.services.tenant_index import generate_inbound_token
+
+MIGRATIONS = []
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('bind_key', String(50), primary_key=True),
+    Column('version', String(20), primary_key=True),
+    Column('description', String(200)),
+    Column('applied_at', DateTime, default=datetime.utcnow),
+)
+
+
+def migration(version, bind_key=None):
+    """Register fn(connection) as migration `version` for a bind (None = main database)"""
+    def register(fn):
+        MIGRATIONS.append((version, bind_key, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+@migration('0001')
+def create_core_tables(connection):
+    """users, integrations and the other models on the main metadata"""
+    db.metadata.create_all(connection)
+
+
+@migration('0002', EVENTS_BIND)
+def create_event_tables(connection):
+    """webhook_logs with its pagination/retention indexes, webhook_stats, outbound_dead_letters"""
+    WebhookLog.__table__.create(connection, checkfirst=True)
+    ensure_indexes(connection)
+    for model in (WebhookStat, OutboundDeadLetter):
+        model.__table__.create(connection, checkfirst=True)
+
+
+@migration('0003', EVENTS_BIND)
+def create_webhook_receipts(connection):
+    """webhook_receipts with a unique (service_name, dedupe_key) for retry deduplication"""
+    WebhookReceipt.__table__.create(connection, checkfirst=True)
+
+
+@migration('0004', EVENTS_BIND)
+def compress_webhook_payloads(connection):
+    """webhook_log_payloads; existing JSON text payloads are compressed into it"""
+    WebhookPayload.__table__.create(connection, checkfirst=True)
+    moved = payload_store.compress_legacy(connection)
+    print(f"Compressed {moved} webhook log payloads")
+
+
+@migration('0005')
+def backfill_inbound_tokens(connection):
+    """inbound_token for Zapier/Make integrations created before tokens were issued"""
+    # Through the model, so the config column's encoding stays the model's business
+    session = Session(bind=connection)
+    filled = 0
+    for integration in session.query(Integration).filter(Integration.service_name.in_(['zapier', 'make'])):
+        config = integration.get_config()
+        if not config.get('inbound_token'):
+            config['inbound_token'] = generate_inbound_token()
+            integration.set_config(config)
+            filled += 1
+    session.flush()
+    session.close()
+    print(f"Issued inbound tokens for {filled} integrations")
+
+
+def _engine_for(bind_key):
+    return events_engine() if bind_key == EVENTS_BIND else db.engine
+
+
+def pending_migrations():
+    """(version, bind_key, fn) not yet applied. Needs an app context"""
+    pending = []
+    for bind_key in (None, EVENTS_BIND):
+        engine = _engine_for(bind_key)
+        schema_migrations.create(engine, checkfirst=True)
+        with engine.connect() as connection:
+            applied = set(connection.execute(
+                select(schema_migrations.c.version).where(schema_migrations.c.bind_key == (bind_key or 'default'))
+            ).scalars())
+        pending.extend(m for m in MIGRATIONS if m[1] == bind_key and m[0] not in applied)
+    return pending
+
+
+def upgrade():
+    """Apply pending migrations, each in its own transaction. Returns the versions applied"""
+    applied = []
+    for version, bind_key, fn in pending_migrations():
+        with _engine_for(bind_key).begin() as connection:
+            fn(connection)
+            connection.execute(schema_migrations.insert().values(
+                bind_key=bind_key or 'default',
+                version=version,
+                description=(fn.__doc__ or fn.__name__).strip()[:200],
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(f"{bind_key or 'default'}:{version}")
+    return applied
+
+
+def init_migrations(app):
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Apply pending schema migrations."""
+        applied = upgrade()
+        print(f"Applied {', '.join(applied)}" if applied else "Database schema is up to date")
@@ -0,0 +1,37 @@
+from datetime import datetime
+import json
+from src.models.user import db
+
+
+class OutboundDeadLetter(db.Model):
+    """Outbound event deliveries that exhausted their retries"""
+    __tablename__ = 'outbound_dead_letters'
+    __bind_key__ = 'events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    integration_id = db.Column(db.Integer, nullable=True)
+    destination_url = db.Column(db.String(500), nullable=False)
+    event_type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def set_payload(self, payload):
+        self.payload = json.dumps(payload)
+
+    def get_payload(self):
+        return json.loads(self.payload) if self.payload else None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'integration_id': self.integration_id,
+            'destination_url': self.destination_url,
+            'event_type': self.event_type,
+            'payload': self.get_payload(),
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at
+        }
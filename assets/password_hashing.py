@@ -0,0 +1,108 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+PARENT_CHECK_INTERVAL = 1.0
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing queue is full; callers should answer 503"""
+
+
+def _exit_with_parent(parent_pid):
+    """Pool initializer: exit once the worker that started this process is gone.
+
+    A worker killed by SIGTERM doesn't run its atexit hooks, and orphaned
+    children would otherwise live on under PID 1 holding its stdout.
+    """
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(PARENT_CHECK_INTERVAL)
+        os._exit(0)
+
+    threading.Thread(target=watch, name='parent-watch', daemon=True).start()
+
+
+class PasswordHasher:
+    """Runs password hashing and verification in a dedicated process pool.
+
+    Hashing is deliberately slow and CPU-bound; doing it in worker processes
+    keeps it off the request threads and out of the GIL. At most
+    `max_pending` jobs may be queued or running at once.
+
+    `method` is a werkzeug method string spelled out with its cost, e.g.
+    'scrypt:32768:8:1' or 'pbkdf2:sha256:600000', so it matches the prefix
+    werkzeug stores. Hashes with a different prefix are reported by
+    needs_rehash() so login can upgrade them.
+    """
+
+    def __init__(self, app=None):
+        self.method = 'scrypt:32768:8:1'
+        self.workers = os.cpu_count() or 1
+        self.max_pending = 64
+        self.queue_timeout = 5
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.shutdown()
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', 64)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        app.extensions['password_hasher'] = self
+
+    def _executor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # spawn: never fork a process that already runs background threads
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_exit_with_parent,
+                        initargs=(os.getpid(),)
+                    )
+                    atexit.register(self.shutdown)
+        return self._pool
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusyError('Password hashing queue is full')
+        try:
+            return self._executor().submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with a different method or cost"""
+        return bool(password_hash) and password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+password_hasher = PasswordHasher()
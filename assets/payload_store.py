@@ -0,0 +1,244 @@
+"""Compressed storage for webhook payloads.
+
+New logs keep an empty payload column; the body goes to webhook_log_payloads
+as zlib (or zstd when the zstandard package is installed and
+WEBHOOK_PAYLOAD_CODEC=zstd), written in the same transaction as the log row
+with one executemany per flush. Each row records its codec, so changing the
+codec or retraining a dictionary never breaks older rows. Listings leave
+payloads out; they are decoded for a single log, exports and archives.
+
+Per-service zstd dictionaries (`flask train-payload-dicts`) live in
+WEBHOOK_PAYLOAD_DICT_DIR as <service>.<dict id>.zdict; the newest file per
+service is used for new rows and every file stays loadable for old ones.
+"""
+import hashlib
+import os
+import threading
+import zlib
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from src.models.user import WebhookLog
+from src.models.webhook_payloads import WebhookPayload
+from src.models.events_db import events_session
+from src.services.json_provider import dumps_bytes, loads
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DICTIONARY_SIZE = 16 * 1024
+DICTIONARY_SAMPLES = 2000
+
+
+class PayloadStore:
+    def __init__(self, app=None):
+        self.codec = 'zlib'
+        self.level = 6
+        self.dict_dir = None
+        self._dictionaries = {}
+        self._service_dicts = {}
+        self._local = threading.local()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.codec = app.config.get('WEBHOOK_PAYLOAD_CODEC', 'zlib')
+        if self.codec == 'zstd' and zstandard is None:
+            print("zstandard is not installed; storing webhook payloads with zlib")
+            self.codec = 'zlib'
+        self.level = app.config.get('WEBHOOK_PAYLOAD_LEVEL', 6)
+        self.dict_dir = app.config.get('WEBHOOK_PAYLOAD_DICT_DIR')
+        self._load_dictionaries()
+        app.extensions['payload_store'] = self
+
+        @app.cli.command('train-payload-dicts')
+        def train_payload_dicts_command():
+            """Train a zstd dictionary per service from recent webhook payloads."""
+            for service_name, path in self.train_dictionaries():
+                print(f"{service_name}: {path}")
+
+    # Encoding
+
+    def encode(self, service_name, payload):
+        """(codec, compressed bytes, uncompressed size) for a JSON-serialisable payload"""
+        raw = dumps_bytes(payload)
+        if self.codec == 'zstd':
+            dict_id = self._service_dicts.get(service_name)
+            codec = f'zstd:{dict_id}' if dict_id else 'zstd'
+            return codec, self._zstd(dict_id, 'compressor').compress(raw), len(raw)
+        return 'zlib', zlib.compress(raw, self.level), len(raw)
+
+    def decode(self, codec, data):
+        if codec == 'zlib':
+            raw = zlib.decompress(data)
+        elif codec.startswith('zstd'):
+            if zstandard is None:
+                raise RuntimeError('zstandard is required to read zstd webhook payloads')
+            raw = self._zstd(codec.partition(':')[2] or None, 'decompressor').decompress(data)
+        else:
+            raise ValueError(f"Unknown payload codec {codec!r}")
+        return loads(raw)
+
+    def _zstd(self, dict_id, kind):
+        # zstd contexts are not thread-safe, so each thread keeps its own per dictionary
+        cache = self._local.__dict__.setdefault(kind, {})
+        context = cache.get(dict_id)
+        if context is None:
+            dictionary = self._dictionaries[dict_id] if dict_id else None
+            if kind == 'compressor':
+                context = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+            else:
+                context = zstandard.ZstdDecompressor(dict_data=dictionary)
+            cache[dict_id] = context
+        return context
+
+    def _load_dictionaries(self):
+        self._dictionaries, self._service_dicts = {}, {}
+        if zstandard is None or not self.dict_dir or not os.path.isdir(self.dict_dir):
+            return
+        newest = {}
+        for name in os.listdir(self.dict_dir):
+            service_name, _, rest = name.partition('.')
+            dict_id = rest.removesuffix('.zdict')
+            if not name.endswith('.zdict') or not dict_id:
+                continue
+            path = os.path.join(self.dict_dir, name)
+            with open(path, 'rb') as f:
+                self._dictionaries[dict_id] = zstandard.ZstdCompressionDict(f.read())
+            mtime = os.path.getmtime(path)
+            if service_name not in newest or mtime > newest[service_name][0]:
+                newest[service_name] = (mtime, dict_id)
+        self._service_dicts = {service_name: dict_id for service_name, (_, dict_id) in newest.items()}
+        self._local = threading.local()
+
+    def train_dictionaries(self):
+        """Write a new dictionary per service from recent payloads. Needs an app context"""
+        if zstandard is None or not self.dict_dir:
+            raise RuntimeError('Set WEBHOOK_PAYLOAD_DICT_DIR and install zstandard to train dictionaries')
+        os.makedirs(self.dict_dir, exist_ok=True)
+
+        written = []
+        services = [row[0] for row in events_session.query(WebhookLog.service_name).distinct()]
+        for service_name in services:
+            logs = events_session.query(WebhookLog).filter_by(service_name=service_name).order_by(
+                WebhookLog.id.desc()
+            ).limit(DICTIONARY_SAMPLES).all()
+            samples = [dumps_bytes(p) for p in self.load(logs).values() if p is not None]
+            if len(samples) < 10:
+                continue
+            data = zstandard.train_dictionary(DICTIONARY_SIZE, samples).as_bytes()
+            dict_id = hashlib.sha256(data).hexdigest()[:12]
+            path = os.path.join(self.dict_dir, f"{service_name}.{dict_id}.zdict")
+            with open(path, 'wb') as f:
+                f.write(data)
+            written.append((service_name, path))
+        self._load_dictionaries()
+        return written
+
+    # Logs
+
+    def attach(self, webhook_log, payload):
+        """Set a new log's payload; the compressed row is inserted right after the log row"""
+        webhook_log.payload = ''
+        webhook_log._stored_payload = self.encode(webhook_log.service_name, payload)
+
+    def load(self, logs):
+        """log id -> decoded payload for a batch of logs, in one query"""
+        ids = [log.id for log in logs]
+        payloads = {}
+        if ids:
+            rows = events_session.execute(
+                select(WebhookPayload.log_id, WebhookPayload.codec, WebhookPayload.data)
+                .where(WebhookPayload.log_id.in_(ids))
+            )
+            payloads = {log_id: self.decode(codec, data) for log_id, codec, data in rows}
+        for log in logs:
+            if log.id not in payloads:
+                payloads[log.id] = legacy_payload(log.payload)
+        return payloads
+
+    def delete(self, log_ids):
+        """Remove payload rows with their logs; commits with the caller's transaction"""
+        events_session.query(WebhookPayload).filter(WebhookPayload.log_id.in_(log_ids)).delete(
+            synchronize_session=False
+        )
+
+    def compress_legacy(self, connection, chunk_size=5000):
+        """Move JSON text payloads written before compression into webhook_log_payloads"""
+        logs, payloads = WebhookLog.__table__, WebhookPayload.__table__
+        moved, last_id = 0, 0
+        while True:
+            rows = connection.execute(
+                select(logs.c.id, logs.c.service_name, logs.c.payload)
+                .where(logs.c.id > last_id, logs.c.payload.isnot(None), logs.c.payload != '')
+                .order_by(logs.c.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                return moved
+
+            values = []
+            for log_id, service_name, text in rows:
+                codec, data, raw_size = self.encode(service_name, legacy_payload(text))
+                values.append({'log_id': log_id, 'codec': codec, 'data': data, 'raw_size': raw_size})
+            connection.execute(payloads.insert(), values)
+            connection.execute(logs.update().where(logs.c.id.in_([row[0] for row in rows])).values(payload=''))
+            moved += len(rows)
+            last_id = rows[-1][0]
+
+
+def legacy_payload(text):
+    if not text:
+        return None
+    try:
+        return loads(text)
+    except ValueError:
+        return text
+
+
+def log_summary(log):
+    """What listings show: everything except the payload"""
+    return {
+        'id': log.id,
+        'user_id': log.user_id,
+        'service_name': log.service_name,
+        'event_type': log.event_type,
+        'status': log.status,
+        'created_at': log.created_at
+    }
+
+
+def log_record(log, payload):
+    record = log_summary(log)
+    record['payload'] = payload
+    return record
+
+
+@event.listens_for(WebhookLog, 'after_insert')
+def _collect_payload(mapper, connection, target):
+    stored = target.__dict__.get('_stored_payload')
+    if stored is None:
+        return
+    codec, data, raw_size = stored
+    object_session(target).info.setdefault('webhook_payloads', []).append(
+        {'log_id': target.id, 'codec': codec, 'data': data, 'raw_size': raw_size}
+    )
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_payloads(session, previous_transaction):
+    # Collected for a flush that failed; the ingest writer re-adds the logs and they are collected again
+    session.info.pop('webhook_payloads', None)
+
+
+@event.listens_for(Session, 'after_flush')
+def _insert_payloads(session, flush_context):
+    # One executemany per flush, so a batch of N logs costs one payload statement, not N
+    rows = session.info.pop('webhook_payloads', None)
+    if rows:
+        session.execute(WebhookPayload.__table__.insert(), rows)
+
+
+payload_store = PayloadStore()
@@ -0,0 +1,57 @@
+import importlib
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+# What src.main imports, in order; each entry's time includes dependencies not already loaded
+APP_MODULES = [
+    'flask',
+    'flask_cors',
+    'sqlalchemy',
+    'src.models.user',
+    'src.services.storage',
+    'src.routes.user',
+    'src.routes.auth',
+    'src.routes.integrations',
+    'src.routes.webhooks',
+    'src.models.events_db',
+    'src.models.migrations',
+]
+
+
+class StartupProfiler:
+    """Collects import and initialisation timings for `python src/main.py --profile-startup`"""
+
+    def __init__(self):
+        self.imports = []
+        self.steps = []
+
+    def profile_imports(self, modules=APP_MODULES):
+        for name in modules:
+            if name in sys.modules:
+                continue
+            start = time.perf_counter()
+            importlib.import_module(name)
+            self.imports.append((name, time.perf_counter() - start))
+
+    @contextmanager
+    def step(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - start))
+
+    def report(self):
+        lines = ['Imports:']
+        lines.extend(f"  {seconds * 1000:8.1f} ms  {name}" for name, seconds in self.imports)
+        lines.append(f"  {sum(s for _, s in self.imports) * 1000:8.1f} ms  total")
+        lines.append('Initialisation:')
+        lines.extend(f"  {seconds * 1000:8.1f} ms  {name}" for name, seconds in self.steps)
+        lines.append(f"  {sum(s for _, s in self.steps) * 1000:8.1f} ms  total")
+        return '\n'.join(lines)
+
+
+def no_profile(name):
+    """Stand-in for StartupProfiler.step when not profiling"""
+    return nullcontext()
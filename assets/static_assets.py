@@ -0,0 +1,228 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import tempfile
+import threading
+
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml', 'text/javascript',
+}
+FINGERPRINT_LENGTH = 12
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+# Local src/href values in HTML; external URLs, anchors and query strings are left alone
+HTML_REFERENCE = re.compile(r'(\b(?:src|href)=")([^"#?:]+)(")')
+HTML_SRCSET = re.compile(r'(\bsrcset=")([^"]+)(")')
+
+
+class StaticAsset:
+    __slots__ = ('path', 'filename', 'mimetype', 'digest', 'body', 'gzip', 'brotli', 'etags')
+
+    def __init__(self, path, filename, mimetype, body):
+        self.path = path
+        self.filename = filename
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH]
+        self.body = body
+        self.gzip = None
+        self.brotli = None
+        self.etags = {self.etag(encoding) for encoding in (None, 'gzip', 'br')}
+
+    def etag(self, encoding=None):
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    @property
+    def fingerprinted_path(self):
+        stem, ext = posixpath.splitext(self.path)
+        return f"{stem}.{self.digest}{ext}"
+
+
+class StaticManifest:
+    """Static files indexed once at startup: content hashes, ETags and precompressed variants.
+
+    Requests are answered from the dict, never the filesystem (files over
+    max_inline_bytes are the exception: only their body is read from disk).
+    HTML pages are rewritten to reference fingerprinted URLs, which are served
+    with an immutable Cache-Control; everything else revalidates by ETag.
+
+    Compressed variants are cached on disk by content hash. `flask
+    static-manifest` fills the cache at deploy time, so worker startup only
+    hashes files and reads the cached variants instead of running gzip -9 and
+    brotli -11 over every asset.
+    """
+
+    def __init__(self, app=None):
+        self.root = None
+        self.enabled = True
+        self.max_inline_bytes = 512 * 1024
+        self.min_compress_bytes = 512
+        self.cache_dir = None
+        self._assets = {}
+        self._fingerprinted = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = app.static_folder
+        self.enabled = app.config.get('STATIC_MANIFEST', True)
+        self.max_inline_bytes = app.config.get('STATIC_MANIFEST_MAX_INLINE_BYTES', 512 * 1024)
+        self.min_compress_bytes = app.config.get('STATIC_MANIFEST_MIN_COMPRESS_BYTES', 512)
+        self.cache_dir = app.config.get(
+            'STATIC_MANIFEST_CACHE_DIR', os.path.join(app.root_path, 'database', 'static-cache')
+        )
+        app.extensions['static_manifest'] = self
+
+        @app.cli.command('static-manifest')
+        def static_manifest_command():
+            """Precompress static files into the cache and list their fingerprints and sizes."""
+            self.build()
+            for path, asset in sorted(self._assets.items()):
+                sizes = [f"gzip {len(asset.gzip)}" if asset.gzip else None,
+                         f"br {len(asset.brotli)}" if asset.brotli else None]
+                print(f"{asset.fingerprinted_path}  {os.path.getsize(asset.filename)} bytes  "
+                      f"{', '.join(s for s in sizes if s) or 'uncompressed'}")
+
+        if self.enabled:
+            self.build()
+
+    def build(self):
+        """Scan the static folder and swap in a fresh manifest"""
+        assets = {}
+        if self.root and os.path.isdir(self.root):
+            pages = []
+            for directory, _, files in os.walk(self.root):
+                for name in files:
+                    filename = os.path.join(directory, name)
+                    path = os.path.relpath(filename, self.root).replace(os.sep, '/')
+                    if path.endswith('.html'):
+                        pages.append((path, filename))
+                    else:
+                        assets[path] = self._load(path, filename)
+
+            # Pages go last so their references can point at the fingerprinted assets
+            for path, filename in pages:
+                with open(filename, 'rb') as f:
+                    html = f.read().decode('utf-8')
+                html = self._fingerprint_references(path, html, assets)
+                assets[path] = self._load(path, filename, html.encode('utf-8'))
+
+        with self._lock:
+            self._assets = assets
+            self._fingerprinted = {asset.fingerprinted_path: asset for asset in assets.values()}
+        return len(assets)
+
+    def _load(self, path, filename, body=None):
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if body is None:
+            with open(filename, 'rb') as f:
+                body = f.read()
+
+        asset = StaticAsset(path, filename, mimetype, body)
+        if len(body) >= self.min_compress_bytes and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES):
+            compressed = self._compressed(asset.digest, 'gz', lambda: gzip.compress(body, compresslevel=9, mtime=0))
+            asset.gzip = compressed if len(compressed) < len(body) else None
+            if brotli is not None:
+                compressed = self._compressed(asset.digest, 'br', lambda: brotli.compress(body, quality=11))
+                asset.brotli = compressed if len(compressed) < len(body) else None
+        if len(body) > self.max_inline_bytes and not path.endswith('.html'):
+            # Hash kept for the ETag; the body stays on disk
+            asset.body = None
+        return asset
+
+    def _compressed(self, digest, suffix, compress):
+        """A compressed variant from the on-disk cache, compressing and caching it on a miss"""
+        if not self.cache_dir:
+            return compress()
+        cached = os.path.join(self.cache_dir, f"{digest}.{suffix}")
+        try:
+            with open(cached, 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+
+        data = compress()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Written under a temporary name so a worker never reads a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, cached)
+        except OSError as e:
+            print(f"Could not cache compressed static file {cached}: {e}")
+        return data
+
+    def _fingerprint_references(self, page_path, html, assets):
+        base = posixpath.dirname(page_path)
+
+        def fingerprint(reference):
+            if reference.startswith('/'):
+                asset = assets.get(reference.lstrip('/'))
+                return '/' + asset.fingerprinted_path if asset else reference
+            asset = assets.get(posixpath.normpath(posixpath.join(base, reference)))
+            return posixpath.relpath(asset.fingerprinted_path, base or '.') if asset else reference
+
+        def replace_srcset(match):
+            candidates = []
+            for candidate in match.group(2).split(','):
+                url, _, descriptor = candidate.strip().partition(' ')
+                candidates.append(f"{fingerprint(url)} {descriptor}".strip())
+            return f"{match.group(1)}{', '.join(candidates)}{match.group(3)}"
+
+        html = HTML_REFERENCE.sub(lambda m: f"{m.group(1)}{fingerprint(m.group(2))}{m.group(3)}", html)
+        return HTML_SRCSET.sub(replace_srcset, html)
+
+    def lookup(self, path):
+        """(asset, immutable) for a request path, or (None, False)"""
+        asset = self._fingerprinted.get(path)
+        if asset is not None:
+            return asset, True
+        return self._assets.get(path), False
+
+    def url_for(self, path):
+        """Fingerprinted URL path for a static file, or the path unchanged if unknown"""
+        asset = self._assets.get(path)
+        return asset.fingerprinted_path if asset else path
+
+    def response(self, asset, immutable=False):
+        """Serve an asset with ETag revalidation and the best encoding the client accepts"""
+        accepted = request.accept_encodings
+        encoding, body = None, asset.body
+        if asset.brotli is not None and accepted['br']:
+            encoding, body = 'br', asset.brotli
+        elif asset.gzip is not None and accepted['gzip']:
+            encoding, body = 'gzip', asset.gzip
+
+        headers = {
+            'ETag': asset.etag(encoding),
+            'Cache-Control': IMMUTABLE if immutable else REVALIDATE,
+        }
+        if asset.gzip is not None or asset.brotli is not None:
+            headers['Vary'] = 'Accept-Encoding'
+
+        sent = {etag.strip().removeprefix('W/') for etag in request.headers.get('If-None-Match', '').split(',')}
+        if '*' in sent or sent & asset.etags:
+            return Response(status=304, headers=headers)
+
+        if body is None:
+            response = send_file(asset.filename, mimetype=asset.mimetype, etag=False, conditional=False)
+        else:
+            response = Response(body, mimetype=asset.mimetype)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        response.headers.update(headers)
+        return response
+
+
+static_manifest = StaticManifest()
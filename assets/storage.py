@@ -0,0 +1,90 @@
+"""Database URI, connection pool and SQLite pragma configuration.
+
+Everything comes from the environment so deployments don't edit code:
+
+    DATABASE_URL              SQLAlchemy URI; defaults to the bundled SQLite file
+    EVENTS_DATABASE_URL       URI for webhook logs and event tables (the 'events' bind);
+                              defaults to events.db next to the SQLite file, or to
+                              DATABASE_URL when that is not SQLite
+    DB_POOL_SIZE              connections kept open per worker (default 5)
+    DB_MAX_OVERFLOW           extra connections under burst (default 10)
+    DB_POOL_TIMEOUT           seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE           recycle connections older than this many seconds (default 1800)
+    SQLITE_BUSY_TIMEOUT_MS    how long a writer waits on a lock before "database is locked" (default 5000)
+    SQLITE_MMAP_SIZE          bytes of the file to memory-map (default 256 MiB)
+    SQLITE_PRAGMAS            set to 0 to leave SQLite at its defaults (benchmark baseline)
+
+On SQLite every new connection is switched to WAL with synchronous=NORMAL,
+so readers never block the single writer and commits skip one fsync.
+
+Postgres: install psycopg2-binary and set
+
+    DATABASE_URL=postgresql+psycopg2://peakwave:<password>@db-host:5432/peakwave
+    DB_POOL_SIZE=10 DB_MAX_OVERFLOW=20
+
+No code changes are needed. The pragmas are skipped and the pool settings
+apply as given; size DB_POOL_SIZE * workers (times two with a separate events
+database) below the server's max_connections.
+"""
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+
+def database_uri(default_path):
+    return os.environ.get('DATABASE_URL') or f"sqlite:///{default_path}"
+
+
+def events_database_uri(main_uri):
+    if os.environ.get('EVENTS_DATABASE_URL'):
+        return os.environ['EVENTS_DATABASE_URL']
+    if main_uri.startswith('sqlite'):
+        # Next to whichever SQLite file DATABASE_URL points at, not the bundled default
+        path = make_url(main_uri).database
+        if path and path != ':memory:':
+            return f"sqlite:///{os.path.join(os.path.dirname(path), 'events.db')}"
+    return main_uri
+
+
+def engine_options(uri):
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    }
+    if uri.startswith('sqlite'):
+        busy_timeout = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+        # Pooled connections move between request and background threads
+        options['connect_args'] = {'timeout': busy_timeout / 1000, 'check_same_thread': False}
+    else:
+        options['pool_pre_ping'] = True
+    return options
+
+
+@event.listens_for(Engine, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    if os.environ.get('SQLITE_PRAGMAS', '1') == '0':
+        return
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    cursor.execute(f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}")
+    cursor.close()
+
+
+def configure_storage(app, default_sqlite_path):
+    """Set the database URI and engine options on the app before db.init_app()"""
+    uri = database_uri(default_sqlite_path)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri)
+
+    # Webhook logs and event tables get their own database and write lock
+    events_uri = events_database_uri(uri)
+    app.config['SQLALCHEMY_BINDS'] = {'events': dict(engine_options(events_uri), url=events_uri)}
@@ -0,0 +1,147 @@
+import secrets
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from src.models.user import Integration
+
+# signing_key: UTF-8 bytes of the secret the provider signs webhooks with, or None
+TenantOwner = namedtuple('TenantOwner', ['integration_id', 'user_id', 'signing_key'], defaults=(None,))
+
+# Where the event dispatcher delivers a user's outbound events
+OutboundTarget = namedtuple('OutboundTarget', ['integration_id', 'service_name', 'url', 'accepts_batches'])
+
+# Config key holding the identifier each provider sends with its webhooks
+IDENTIFIER_KEYS = {
+    'twilio': 'account_sid',
+    'gohighlevel': 'location_id',
+    'zapier': 'inbound_token',
+    'make': 'inbound_token',
+}
+
+# Config key holding the secret each provider signs its webhooks with
+SIGNING_KEYS = {
+    'twilio': 'auth_token',
+    'gohighlevel': 'webhook_secret',
+    'zapier': 'webhook_secret',
+    'make': 'webhook_secret',
+}
+
+# Services that receive outbound events at their webhook_url
+OUTBOUND_SERVICES = {'zapier', 'make'}
+
+
+def generate_inbound_token():
+    """Token embedded in the Zapier/Make webhook URL to identify the owning integration"""
+    return secrets.token_urlsafe(24)
+
+
+class TenantIndex:
+    """In-memory map of (service_name, provider identifier) to the owning integration and its signing key,
+    plus each user's outbound webhook targets.
+
+    invalidate() only reaches the current process, so the index also expires
+    after `ttl` seconds; other workers pick up new, removed or re-keyed
+    integrations within that window. An expired index keeps answering while a
+    background thread rebuilds it.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.ttl = 30
+        self._index = None
+        self._outbound = None
+        self._built_at = 0.0
+        self._generation = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.ttl = app.config.get('TENANT_INDEX_TTL', 30)
+        app.extensions['tenant_index'] = self
+
+    def build(self):
+        """Load every active integration into the index. Needs an app context"""
+        return self._build()[0]
+
+    def _build(self):
+        with self._lock:
+            generation = self._generation
+
+        index = {}
+        outbound = defaultdict(list)
+        for integration in Integration.query.filter_by(is_active=True).all():
+            config = integration.get_config()
+            key = IDENTIFIER_KEYS.get(integration.service_name)
+            identifier = config.get(key) if key else None
+            if identifier:
+                signing_key = config.get(SIGNING_KEYS.get(integration.service_name))
+                index[(integration.service_name, identifier)] = TenantOwner(
+                    integration.id, integration.user_id, signing_key.encode('utf-8') if signing_key else None
+                )
+            if integration.service_name in OUTBOUND_SERVICES and integration.webhook_url:
+                outbound[integration.user_id].append(OutboundTarget(
+                    integration.id, integration.service_name, integration.webhook_url,
+                    bool(config.get('accepts_batches'))
+                ))
+
+        outbound = dict(outbound)
+        with self._lock:
+            # An invalidation during the load means this snapshot is already stale
+            if generation == self._generation:
+                self._index = index
+                self._outbound = outbound
+                self._built_at = time.monotonic()
+        return index, outbound
+
+    def refresh_async(self):
+        """Rebuild in a background thread; concurrent callers share one rebuild"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='tenant-index-refresh', daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self.app.app_context():
+                self.build()
+        except Exception as e:
+            print(f"Tenant index refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self):
+        """Drop the index; the next lookup rebuilds it"""
+        with self._lock:
+            self._generation += 1
+            self._index = None
+            self._outbound = None
+
+    def resolve(self, service_name, identifier):
+        """Return the TenantOwner for a provider identifier, or None"""
+        if not identifier:
+            return None
+
+        index = self._index
+        if index is None:
+            index = self.build()
+        elif self.ttl and time.monotonic() - self._built_at > self.ttl:
+            self.refresh_async()
+        return index.get((service_name, identifier))
+
+    def destinations(self, user_id):
+        """OutboundTargets for the user's active Zapier/Make integrations with a webhook_url"""
+        outbound = self._outbound
+        if outbound is None:
+            outbound = self._build()[1]
+        elif self.ttl and time.monotonic() - self._built_at > self.ttl:
+            self.refresh_async()
+        return outbound.get(user_id, [])
+
+
+tenant_index = TenantIndex()
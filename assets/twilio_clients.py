@@ -0,0 +1,66 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class TwilioClientRegistry:
+    """Bounded LRU of twilio.rest.Client instances keyed by account SID and token fingerprint.
+
+    Reusing a client keeps its HTTP session (and warm connections) alive between
+    calls. The Twilio SDK is imported on first use so it never adds to startup.
+    """
+
+    def __init__(self, app=None):
+        self.max_size = 64
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_size = app.config.get('TWILIO_CLIENT_CACHE_SIZE', 64)
+        app.extensions['twilio_clients'] = self
+
+    @staticmethod
+    def _key(account_sid, auth_token):
+        fingerprint = hashlib.sha256(auth_token.encode('utf-8')).hexdigest()[:16]
+        return account_sid, fingerprint
+
+    def get(self, account_sid, auth_token):
+        """Return a cached Client for these credentials, creating it if needed"""
+        key = self._key(account_sid, auth_token)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+        from twilio.rest import Client
+        client = Client(account_sid, auth_token)
+
+        with self._lock:
+            # Another thread may have built one meanwhile; keep the first
+            client = self._clients.setdefault(key, client)
+            self._clients.move_to_end(key)
+            while len(self._clients) > self.max_size:
+                self._clients.popitem(last=False)
+        return client
+
+    def for_config(self, config):
+        """Client for an integration's get_config(), or None when credentials are missing"""
+        account_sid = config.get('account_sid')
+        auth_token = config.get('auth_token')
+        if not account_sid or not auth_token:
+            return None
+        return self.get(account_sid, auth_token)
+
+    def evict(self, account_sid):
+        """Drop every client for an account, whatever token it was built with"""
+        if not account_sid:
+            return
+        with self._lock:
+            for key in [key for key in self._clients if key[0] == account_sid]:
+                del self._clients[key]
+
+
+twilio_clients = TwilioClientRegistry()
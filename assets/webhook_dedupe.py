@@ -0,0 +1,165 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.webhook_receipts import WebhookReceipt
+from src.models.events_db import events_engine
+
+INSERT_DIALECTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+GHL_EVENT_ID_KEYS = ('webhookId', 'eventId', 'event_id', 'id')
+
+
+def natural_id(service_name, data, raw_body=b''):
+    """The provider's own id for a delivery, so a retry maps to the same key. None if there is none"""
+    if service_name == 'twilio':
+        # A message or call reports several statuses; each status is its own event
+        if data.get('MessageSid'):
+            return f"{data['MessageSid']}:{data.get('MessageStatus') or data.get('SmsStatus', '')}"
+        if data.get('CallSid'):
+            return f"{data['CallSid']}:{data.get('CallStatus', '')}"
+        return None
+    if service_name == 'gohighlevel':
+        for key in GHL_EVENT_ID_KEYS:
+            if data.get(key):
+                return f"{data.get('type', '')}:{data[key]}"
+    # Zapier and Make send no delivery id; a retry resends the same body
+    if isinstance(data, dict) and data:
+        return 'sha256:' + hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+    return 'sha256:' + hashlib.sha256(raw_body).hexdigest() if raw_body else None
+
+
+class WebhookDedupe:
+    """Drops provider retries of a webhook that was already accepted.
+
+    A bounded LRU of recently seen keys answers repeats without touching the
+    database. Receipts are inserted by whoever writes the log row (normally
+    the ingest batch writer), in the same transaction; the unique index on
+    webhook_receipts catches retries that landed on another worker or arrived
+    after a restart, and their log rows are dropped there.
+
+    Such a cross-worker retry is only caught at write time: its request has
+    already run the process_* handler, dispatched outbound events and been
+    counted by webhook_metrics. Only the duplicate log row is prevented.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.ttl = 86400
+        self.max_entries = 100000
+        self.duplicates = 0
+        self._seen = OrderedDict()
+        self._released = set()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('WEBHOOK_DEDUPE', True)
+        self.ttl = app.config.get('WEBHOOK_DEDUPE_TTL', 86400)
+        self.max_entries = app.config.get('WEBHOOK_DEDUPE_CACHE_SIZE', 100000)
+        with self._lock:
+            self._seen.clear()
+            self._released.clear()
+        app.extensions['webhook_dedupe'] = self
+
+    def key_for(self, service_name, user_id, data, raw_body=b''):
+        """Fixed-size key scoped to the owning account, or None when the delivery can't be identified"""
+        if not self.enabled:
+            return None
+        identity = natural_id(service_name, data, raw_body)
+        if identity is None:
+            return None
+        return hashlib.sha256(f"{user_id}:{identity}".encode()).hexdigest()
+
+    def claim(self, service_name, key):
+        """True the first time this process sees a key; False for a retry. A None key is always new"""
+        if key is None:
+            return True
+
+        now = time.monotonic()
+        cache_key = (service_name, key)
+        with self._lock:
+            expires = self._seen.get(cache_key)
+            if expires is not None and expires > now:
+                self.duplicates += 1
+                return False
+            self._seen[cache_key] = now + self.ttl
+            self._seen.move_to_end(cache_key)
+            while len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            self._released.discard(cache_key)
+        return True
+
+    def release(self, service_name, key):
+        """Forget a claim whose processing failed, so the provider's retry is accepted"""
+        if key is None:
+            return
+        with self._lock:
+            self._seen.pop((service_name, key), None)
+            # The writer skips this receipt, or deletes it if an earlier batch already wrote it
+            self._released.add((service_name, key))
+
+    def write_receipts(self, session, logs):
+        """Insert receipts for a batch of WebhookLogs in the session's transaction.
+
+        Returns the logs to write: those whose receipt was new, plus any
+        without a dedupe key. Logs for retries another worker already
+        recorded are left out.
+        """
+        with self._lock:
+            released, self._released = self._released, set()
+        table = WebhookReceipt.__table__
+        if released:
+            session.execute(table.delete().where(
+                tuple_(table.c.service_name, table.c.dedupe_key).in_(list(released))
+            ))
+
+        values = {}
+        for log in logs:
+            cache_key = log.__dict__.get('_dedupe_key')
+            if cache_key and cache_key not in released:
+                values.setdefault(cache_key, log)
+        if not values:
+            return logs
+
+        insert = INSERT_DIALECTS[events_engine().dialect.name](table)
+        received_at = datetime.utcnow()
+        statement = insert.values([
+            {'service_name': service_name, 'dedupe_key': key, 'received_at': received_at}
+            for service_name, key in values
+        ]).on_conflict_do_nothing(
+            index_elements=['service_name', 'dedupe_key']
+        ).returning(table.c.service_name, table.c.dedupe_key)
+        inserted = {tuple(row) for row in session.execute(statement)}
+
+        kept = []
+        for log in logs:
+            cache_key = log.__dict__.get('_dedupe_key')
+            if not cache_key or cache_key in released or (cache_key in inserted and values[cache_key] is log):
+                kept.append(log)
+        if len(kept) < len(logs):
+            with self._lock:
+                self.duplicates += len(logs) - len(kept)
+        return kept
+
+    def prune(self):
+        """Delete receipts older than the TTL; providers have stopped retrying them. Runs from log retention"""
+        table = WebhookReceipt.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        try:
+            with events_engine().begin() as connection:
+                connection.execute(table.delete().where(table.c.received_at < cutoff))
+        except Exception as e:
+            print(f"Failed to prune webhook receipts: {e}")
+
+
+webhook_dedupe = WebhookDedupe()
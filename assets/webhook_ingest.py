@@ -0,0 +1,139 @@
+import atexit
+import queue
+import threading
+import time
+
+from src.models.events_db import events_session
+from src.services.webhook_dedupe import webhook_dedupe
+
+
+class WebhookIngestQueue:
+    """Bounded in-process queue that writes WebhookLog rows in group-committed batches"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 200
+        self.flush_interval = 0.25
+        self.write_retries = 2
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Re-initialising (tests, benchmarks) must not leave rows behind
+        self.shutdown()
+
+        self.app = app
+        self.enabled = app.config.get('WEBHOOK_INGEST_ASYNC', False)
+        self.batch_size = app.config.get('WEBHOOK_INGEST_BATCH_SIZE', 200)
+        self.flush_interval = app.config.get('WEBHOOK_INGEST_FLUSH_INTERVAL', 0.25)
+        self.write_retries = app.config.get('WEBHOOK_INGEST_WRITE_RETRIES', 2)
+        self._queue = queue.Queue(maxsize=app.config.get('WEBHOOK_INGEST_MAX_QUEUE', 10000))
+        app.extensions['webhook_ingest'] = self
+
+    def start(self):
+        """Start the background writer thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='webhook-ingest-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, webhook_log):
+        """Queue a WebhookLog for the writer. Returns False when the caller must write it itself"""
+        if not self.enabled or not self._thread or not self._thread.is_alive():
+            return False
+
+        try:
+            self._queue.put_nowait(webhook_log)
+            return True
+        except queue.Full:
+            # Backpressure: the caller falls back to a synchronous write
+            return False
+
+    def pending(self):
+        return self._queue.qsize() if self._queue else 0
+
+    def flush(self):
+        """Write everything currently queued"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except (queue.Empty, AttributeError):
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def shutdown(self):
+        """Stop the writer and flush what is left in the queue"""
+        if self._thread and self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        self._thread = None
+        if self._queue is not None and self.app is not None:
+            self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+
+    def _write(self, batch):
+        with self._write_lock, self.app.app_context():
+            try:
+                # A transient failure ("database is locked") usually clears on a retry
+                for attempt in range(self.write_retries + 1):
+                    if self._commit(batch):
+                        return
+                    if attempt < self.write_retries:
+                        time.sleep(self.flush_interval * (attempt + 1))
+
+                # Still failing: one row at a time, so a bad row costs only itself
+                for webhook_log in batch:
+                    if not self._commit([webhook_log]):
+                        self.dropped += 1
+            finally:
+                events_session.remove()
+
+    def _commit(self, logs):
+        try:
+            # Receipts go in the same transaction; retries already recorded elsewhere are dropped
+            events_session.add_all(webhook_dedupe.write_receipts(events_session, logs))
+            events_session.commit()
+            return True
+        except Exception as e:
+            events_session.rollback()
+            for webhook_log in logs:
+                # Rollback expunges the rows but leaves the ids the failed flush assigned
+                webhook_log.id = None
+            print(f"Failed to write {len(logs)} webhook logs: {e}")
+            return False
+
+
+webhook_ingest = WebhookIngestQueue()
@@ -0,0 +1,30 @@
+from src.models.user import WebhookLog, db
+
+# Keyset pagination seeks on (created_at, id) within a user, optionally per service
+webhook_logs_user_service_created = db.Index(
+    'ix_webhook_logs_user_service_created_id',
+    WebhookLog.user_id,
+    WebhookLog.service_name,
+    WebhookLog.created_at,
+    WebhookLog.id,
+)
+
+webhook_logs_user_created = db.Index(
+    'ix_webhook_logs_user_created_id',
+    WebhookLog.user_id,
+    WebhookLog.created_at,
+    WebhookLog.id,
+)
+
+# Retention scans the oldest rows across all users
+webhook_logs_created = db.Index(
+    'ix_webhook_logs_created_id',
+    WebhookLog.created_at,
+    WebhookLog.id,
+)
+
+
+def ensure_indexes(bind):
+    """Create the webhook log indexes on databases whose table predates them"""
+    for index in (webhook_logs_user_service_created, webhook_logs_user_created, webhook_logs_created):
+        index.create(bind=bind, checkfirst=True)
@@ -0,0 +1,111 @@
+import atexit
+import threading
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.user import db
+from src.models.webhook_stats import WebhookStat
+from src.models.events_db import events_engine
+
+UPSERT_DIALECTS = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def minute_bucket(when):
+    return when.replace(second=0, microsecond=0)
+
+
+class WebhookMetrics:
+    """In-memory webhook counters, periodically upserted into the webhook_stats rollup"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.flush_interval = 10
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.stop()
+        self.app = app
+        self.flush_interval = app.config.get('WEBHOOK_STATS_FLUSH_INTERVAL', 10)
+        app.extensions['webhook_metrics'] = self
+
+    def record(self, user_id, service_name, event_type, status, when=None):
+        """Count one webhook event in its minute bucket"""
+        key = (user_id, minute_bucket(when or datetime.utcnow()), service_name, event_type, status)
+        with self._lock:
+            self._counts[key] += 1
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='webhook-metrics-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the flush thread and write out any pending counts"""
+        if self._thread and self._thread.is_alive():
+            self._stop.set()
+            self._thread.join()
+        self._thread = None
+        if self.app is not None and self._counts:
+            self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Upsert pending counts into webhook_stats"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return
+
+        rows = [
+            {
+                'user_id': user_id,
+                'bucket': bucket,
+                'service_name': service_name,
+                'event_type': event_type,
+                'status': status,
+                'count': count,
+                'updated_at': datetime.utcnow()
+            }
+            for (user_id, bucket, service_name, event_type, status), count in counts.items()
+        ]
+
+        with self.app.app_context():
+            try:
+                insert = UPSERT_DIALECTS[events_engine().dialect.name](WebhookStat.__table__)
+                statement = insert.on_conflict_do_update(
+                    index_elements=['user_id', 'bucket', 'service_name', 'event_type', 'status'],
+                    set_={
+                        'count': WebhookStat.__table__.c.count + insert.excluded.count,
+                        'updated_at': insert.excluded.updated_at
+                    }
+                )
+                db.session.execute(statement, rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                # Put the counts back so the next flush retries them
+                with self._lock:
+                    self._counts.update(counts)
+                print(f"Failed to flush webhook stats: {e}")
+            finally:
+                db.session.remove()
+
+
+webhook_metrics = WebhookMetrics()
@@ -0,0 +1,13 @@
+from src.models.user import db
+
+
+class WebhookPayload(db.Model):
+    """Compressed body of a WebhookLog, kept out of the listing table and decoded only on demand"""
+    __tablename__ = 'webhook_log_payloads'
+    __bind_key__ = 'events'
+
+    # Same value as webhook_logs.id; no foreign key so either table can be archived or moved on its own
+    log_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    codec = db.Column(db.String(40), nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    raw_size = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class WebhookReceipt(db.Model):
+    """One row per webhook delivery accepted for processing; the unique key rejects provider retries"""
+    __tablename__ = 'webhook_receipts'
+    __bind_key__ = 'events'
+    __table_args__ = (
+        db.UniqueConstraint('service_name', 'dedupe_key', name='uq_webhook_receipts_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    service_name = db.Column(db.String(50), nullable=False)
+    dedupe_key = db.Column(db.String(64), nullable=False)
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
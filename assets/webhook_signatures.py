@@ -0,0 +1,91 @@
+import base64
+import hashlib
+import hmac
+import threading
+
+TWILIO_HEADER = 'X-Twilio-Signature'
+HMAC_HEADER = 'X-Webhook-Signature'
+
+
+def twilio_signature(signing_key, url, params):
+    """Twilio's scheme: base64 HMAC-SHA1 over the full URL followed by each POST param name and value, sorted"""
+    message = url + ''.join(name + value for name, value in sorted(params))
+    return base64.b64encode(hmac.new(signing_key, message.encode('utf-8'), hashlib.sha1).digest()).decode('ascii')
+
+
+def hmac_signature(signing_key, body):
+    """Hex HMAC-SHA256 of the raw request body, sent as X-Webhook-Signature: sha256=<hex>"""
+    return hmac.new(signing_key, body, hashlib.sha256).hexdigest()
+
+
+class WebhookSignatures:
+    """Rejects forged webhooks before they are parsed, deduplicated or logged.
+
+    Signing keys come from the tenant index, which caches them from
+    Integration.get_config() alongside the owner: Twilio's auth_token, and a
+    per-integration webhook_secret for GoHighLevel, Zapier and Make. Once an
+    integration has a key, requests without a valid signature are rejected.
+    Integrations without one are accepted unsigned, and counted in
+    `unsigned`, unless WEBHOOK_REQUIRE_SIGNATURES is set.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.require = False
+        self.public_url = None
+        self.rejected = 0
+        self.unsigned = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('WEBHOOK_SIGNATURES', True)
+        self.require = app.config.get('WEBHOOK_REQUIRE_SIGNATURES', False)
+        # Twilio signs the URL it called; behind a proxy that differs from request.url
+        self.public_url = (app.config.get('WEBHOOK_PUBLIC_URL') or '').rstrip('/') or None
+        if self.enabled and not self.require:
+            print("WEBHOOK_REQUIRE_SIGNATURES is off: integrations without a webhook_secret accept unsigned "
+                  "webhooks (see the webhook_unsigned_accepts metric)")
+        app.extensions['webhook_signatures'] = self
+
+    def verify(self, service_name, owner, request):
+        """True when the request carries a valid signature for the owner's key, or needs none"""
+        if not self.enabled:
+            return True
+        if owner.signing_key is None:
+            if not self.require:
+                with self._lock:
+                    self.unsigned += 1
+                return True
+            valid = False
+        elif service_name == 'twilio':
+            valid = self._compare(
+                twilio_signature(owner.signing_key, self._signed_url(request), request.form.items(multi=True)),
+                request.headers.get(TWILIO_HEADER)
+            )
+        else:
+            provided = request.headers.get(HMAC_HEADER)
+            valid = self._compare(
+                hmac_signature(owner.signing_key, request.get_data(cache=True)),
+                provided.removeprefix('sha256=') if provided else None
+            )
+        if not valid:
+            with self._lock:
+                self.rejected += 1
+        return valid
+
+    def _signed_url(self, request):
+        if self.public_url:
+            return self.public_url + request.full_path.rstrip('?')
+        return request.url
+
+    @staticmethod
+    def _compare(expected, provided):
+        if not provided:
+            return False
+        # Constant-time, so response timing leaks nothing about the expected signature
+        return hmac.compare_digest(expected.encode('ascii'), provided.encode('utf-8'))
+
+
+webhook_signatures = WebhookSignatures()
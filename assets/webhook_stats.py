@@ -0,0 +1,30 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class WebhookStat(db.Model):
+    """Per-minute webhook counts rolled up from log_webhook()"""
+    __tablename__ = 'webhook_stats'
+    __bind_key__ = 'events'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'bucket', 'service_name', 'event_type', 'status',
+                            name='uq_webhook_stats_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    service_name = db.Column(db.String(50), nullable=False)
+    event_type = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'service_name': self.service_name,
+            'event_type': self.event_type,
+            'status': self.status,
+            'bucket': self.bucket,
+            'count': self.count
+        }
@@ -1,21 +1,40 @@
 from flask import Blueprint, jsonify, request
-from src.models.user import User, Integration, WebhookLog, db
+from src.models.user import WebhookLog
+from src.services.webhook_ingest import webhook_ingest
+from src.services.tenant_index import tenant_index
+from src.services.webhook_metrics import webhook_metrics
+from src.services.event_dispatcher import event_dispatcher
+from src.services.webhook_dedupe import webhook_dedupe
+from src.services.webhook_signatures import webhook_signatures
+from src.services.payload_store import payload_store
+from src.models.events_db import events_session
 from datetime import datetime
-import json
-import hmac
-import hashlib
 
 webhooks_bp = Blueprint('webhooks', __name__)
 
 @webhooks_bp.route('/webhooks/twilio', methods=['POST'])
 def handle_twilio_webhook():
     """Handle incoming webhooks from Twilio"""
+    owner = None
+    dedupe_key = None
     try:
-        # Get the raw data
-        data = request.get_data(as_text=True)
+        # Resolve the owning integration from the Twilio account
+        owner = tenant_index.resolve('twilio', request.form.get('AccountSid'))
+        if not owner:
+            return jsonify({'error': 'Unknown integration'}), 404
+        
+        # Forged requests stop here, before any database work
+        if not webhook_signatures.verify('twilio', owner, request):
+            return jsonify({'error': 'Invalid signature'}), 401
+        
+        # Provider retries of an accepted delivery are acknowledged without being logged again
+        dedupe_key = webhook_dedupe.key_for('twilio', owner.user_id, request.form.to_dict())
+        if not webhook_dedupe.claim('twilio', dedupe_key):
+            return jsonify({'status': 'success', 'duplicate': True}), 200
         
         # Log the webhook
-        log_webhook('twilio', 'incoming_webhook', request.form.to_dict())
+        log_webhook('twilio', 'incoming_webhook', request.form.to_dict(), user_id=owner.user_id,
+                    dedupe_key=dedupe_key)
         
         # Process Twilio webhook data
         event_type = request.form.get('MessageStatus', 'unknown')
@@ -31,120 +50,181 @@ def handle_twilio_webhook():
         return jsonify({'status': 'success'}), 200
         
     except Exception as e:
-        log_webhook('twilio', 'webhook_error', {'error': str(e)}, status='failed')
+        webhook_dedupe.release('twilio', dedupe_key)
+        log_webhook('twilio', 'webhook_error', {'error': str(e)}, status='failed',
+                    user_id=owner and owner.user_id)
         return jsonify({'error': 'Webhook processing failed'}), 500
 
 @webhooks_bp.route('/webhooks/gohighlevel', methods=['POST'])
 def handle_gohighlevel_webhook():
     """Handle incoming webhooks from GoHighLevel"""
+    owner = None
+    dedupe_key = None
     try:
         data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No data received'}), 400
         
+        # Resolve the owning integration from the GoHighLevel location
+        owner = tenant_index.resolve('gohighlevel', data.get('locationId'))
+        if not owner:
+            return jsonify({'error': 'Unknown integration'}), 404
+        
+        # The signature covers the raw body; forged requests stop before any database work
+        if not webhook_signatures.verify('gohighlevel', owner, request):
+            return jsonify({'error': 'Invalid signature'}), 401
+        
+        # Provider retries of an accepted delivery are acknowledged without being logged again
+        dedupe_key = webhook_dedupe.key_for('gohighlevel', owner.user_id, data)
+        if not webhook_dedupe.claim('gohighlevel', dedupe_key):
+            return jsonify({'status': 'success', 'duplicate': True}), 200
+        
         # Log the webhook
-        log_webhook('gohighlevel', data.get('type', 'unknown'), data)
+        log_webhook('gohighlevel', data.get('type', 'unknown'), data, user_id=owner.user_id,
+                    dedupe_key=dedupe_key)
         
         # Process GoHighLevel webhook data
         event_type = data.get('type')
         
         if event_type == 'ContactCreate':
-            process_ghl_contact_created(data)
+            process_ghl_contact_created(data, owner.user_id)
         elif event_type == 'ContactUpdate':
-            process_ghl_contact_updated(data)
+            process_ghl_contact_updated(data, owner.user_id)
         elif event_type == 'ConversationMessage':
             process_ghl_message_received(data)
         
         return jsonify({'status': 'success'}), 200
         
     except Exception as e:
-        log_webhook('gohighlevel', 'webhook_error', {'error': str(e)}, status='failed')
+        webhook_dedupe.release('gohighlevel', dedupe_key)
+        log_webhook('gohighlevel', 'webhook_error', {'error': str(e)}, status='failed',
+                    user_id=owner and owner.user_id)
         return jsonify({'error': 'Webhook processing failed'}), 500
 
-@webhooks_bp.route('/webhooks/zapier', methods=['POST'])
-def handle_zapier_webhook():
+@webhooks_bp.route('/webhooks/zapier', methods=['POST'], defaults={'token': None})
+@webhooks_bp.route('/webhooks/zapier/<token>', methods=['POST'])
+def handle_zapier_webhook(token):
     """Handle incoming webhooks from Zapier"""
+    owner = None
+    dedupe_key = None
     try:
+        # Resolve the owning integration from the token in the webhook URL
+        owner = tenant_index.resolve('zapier', token or request.args.get('token'))
+        if not owner:
+            return jsonify({'error': 'Unknown integration'}), 404
+        
+        # Verified against the raw body before it is parsed or anything is written
+        if not webhook_signatures.verify('zapier', owner, request):
+            return jsonify({'error': 'Invalid signature'}), 401
+        
         data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No data received'}), 400
         
+        # Provider retries of an accepted delivery are acknowledged without being logged again
+        dedupe_key = webhook_dedupe.key_for('zapier', owner.user_id, data)
+        if not webhook_dedupe.claim('zapier', dedupe_key):
+            return jsonify({'status': 'success', 'duplicate': True}), 200
+        
         # Log the webhook
-        log_webhook('zapier', data.get('event_type', 'unknown'), data)
+        log_webhook('zapier', data.get('event_type', 'unknown'), data, user_id=owner.user_id,
+                    dedupe_key=dedupe_key)
         
         # Process Zapier webhook data
         event_type = data.get('event_type')
         
         if event_type == 'new_lead':
-            process_zapier_new_lead(data)
+            process_zapier_new_lead(data, owner.user_id)
         elif event_type == 'form_submission':
             process_zapier_form_submission(data)
         
         return jsonify({'status': 'success'}), 200
         
     except Exception as e:
-        log_webhook('zapier', 'webhook_error', {'error': str(e)}, status='failed')
+        webhook_dedupe.release('zapier', dedupe_key)
+        log_webhook('zapier', 'webhook_error', {'error': str(e)}, status='failed',
+                    user_id=owner and owner.user_id)
         return jsonify({'error': 'Webhook processing failed'}), 500
 
-@webhooks_bp.route('/webhooks/make', methods=['POST'])
-def handle_make_webhook():
+@webhooks_bp.route('/webhooks/make', methods=['POST'], defaults={'token': None})
+@webhooks_bp.route('/webhooks/make/<token>', methods=['POST'])
+def handle_make_webhook(token):
     """Handle incoming webhooks from Make.com"""
+    owner = None
+    dedupe_key = None
     try:
+        # Resolve the owning integration from the token in the webhook URL
+        owner = tenant_index.resolve('make', token or request.args.get('token'))
+        if not owner:
+            return jsonify({'error': 'Unknown integration'}), 404
+        
+        # Verified against the raw body before it is parsed or anything is written
+        if not webhook_signatures.verify('make', owner, request):
+            return jsonify({'error': 'Invalid signature'}), 401
+        
         data = request.get_json()
         
         if not data:
             return jsonify({'error': 'No data received'}), 400
         
+        # Provider retries of an accepted delivery are acknowledged without being logged again
+        dedupe_key = webhook_dedupe.key_for('make', owner.user_id, data)
+        if not webhook_dedupe.claim('make', dedupe_key):
+            return jsonify({'status': 'success', 'duplicate': True}), 200
+        
         # Log the webhook
-        log_webhook('make', data.get('trigger', 'unknown'), data)
+        log_webhook('make', data.get('trigger', 'unknown'), data, user_id=owner.user_id,
+                    dedupe_key=dedupe_key)
         
         # Process Make.com webhook data
         trigger_type = data.get('trigger')
         
         if trigger_type == 'contact_created':
-            process_make_contact_created(data)
+            process_make_contact_created(data, owner.user_id)
         elif trigger_type == 'automation_triggered':
             process_make_automation_triggered(data)
         
         return jsonify({'status': 'success'}), 200
         
     except Exception as e:
-        log_webhook('make', 'webhook_error', {'error': str(e)}, status='failed')
+        webhook_dedupe.release('make', dedupe_key)
+        log_webhook('make', 'webhook_error', {'error': str(e)}, status='failed',
+                    user_id=owner and owner.user_id)
         return jsonify({'error': 'Webhook processing failed'}), 500
 
-def log_webhook(service_name, event_type, payload, status='success', user_id=None):
-    """Log webhook events to database"""
+def log_webhook(service_name, event_type, payload, status='success', user_id=None, dedupe_key=None):
+    """Log webhook events to database; the dedupe receipt is written with the row"""
     try:
-        # If no user_id provided, try to find from payload or use test user
+        # The owner comes from the tenant index; never guess an account
         if not user_id:
-            # For demo purposes, use the first user or create a test user
-            user = User.query.first()
-            if not user:
-                # Create test user if none exists
-                user = User(
-                    email='test@peakwave.com',
-                    first_name='Test',
-                    last_name='User'
-                )
-                user.set_password('TestPassword123')
-                db.session.add(user)
-                db.session.commit()
-            user_id = user.id
+            print(f"Skipping {service_name} webhook log: no owning integration")
+            return
         
         webhook_log = WebhookLog(
             user_id=user_id,
             service_name=service_name,
             event_type=event_type,
-            status=status
+            status=status,
+            created_at=datetime.utcnow()
         )
-        webhook_log.set_payload(payload)
+        payload_store.attach(webhook_log, payload)
+        if dedupe_key:
+            webhook_log._dedupe_key = (service_name, dedupe_key)
+        
+        # Dashboard counters are rolled up in memory and flushed to webhook_stats
+        webhook_metrics.record(user_id, service_name, event_type, status, webhook_log.created_at)
+        
+        # Hand off to the batched writer when async ingest is enabled
+        if webhook_ingest.submit(webhook_log):
+            return
         
-        db.session.add(webhook_log)
-        db.session.commit()
+        events_session.add_all(webhook_dedupe.write_receipts(events_session, [webhook_log]))
+        events_session.commit()
         
     except Exception as e:
+        events_session.rollback()
         print(f"Failed to log webhook: {e}")
 
 def process_twilio_sms_status(data):
@@ -163,21 +243,28 @@ def process_twilio_call_status(data):
     # Here you would typically update your database with the call status
     print(f"Call {call_sid} status: {status}")
 
-def process_ghl_contact_created(data):
+def process_ghl_contact_created(data, user_id=None):
     """Process GoHighLevel contact creation"""
     contact_id = data.get('contactId')
     contact_data = data.get('contact', {})
     
     # Here you would typically sync the contact to your system
     print(f"New GHL contact created: {contact_id}")
+    
+    # Fan out to the user's Zapier/Make webhooks without waiting on them
+    event_dispatcher.dispatch(user_id, 'contact.created',
+                              {'contact_id': contact_id, 'contact': contact_data}, source='gohighlevel')
 
-def process_ghl_contact_updated(data):
+def process_ghl_contact_updated(data, user_id=None):
     """Process GoHighLevel contact updates"""
     contact_id = data.get('contactId')
     contact_data = data.get('contact', {})
     
     # Here you would typically update the contact in your system
     print(f"GHL contact updated: {contact_id}")
+    
+    event_dispatcher.dispatch(user_id, 'contact.updated',
+                              {'contact_id': contact_id, 'contact': contact_data}, source='gohighlevel')
 
 def process_ghl_message_received(data):
     """Process GoHighLevel message received"""
@@ -187,12 +274,14 @@ def process_ghl_message_received(data):
     # Here you would typically process the incoming message
     print(f"New GHL message in conversation: {conversation_id}")
 
-def process_zapier_new_lead(data):
+def process_zapier_new_lead(data, user_id=None):
     """Process new lead from Zapier"""
     lead_data = data.get('lead', {})
     
     # Here you would typically create a new lead in your system
     print(f"New lead from Zapier: {lead_data.get('email', 'Unknown')}")
+    
+    event_dispatcher.dispatch(user_id, 'lead.created', {'lead': lead_data}, source='zapier')
 
 def process_zapier_form_submission(data):
     """Process form submission from Zapier"""
@@ -201,12 +290,14 @@ def process_zapier_form_submission(data):
     # Here you would typically process the form submission
     print(f"Form submission from Zapier: {form_data}")
 
-def process_make_contact_created(data):
+def process_make_contact_created(data, user_id=None):
     """Process contact creation from Make.com"""
     contact_data = data.get('data', {})
     
     # Here you would typically create a new contact in your system
     print(f"New contact from Make.com: {contact_data.get('email', 'Unknown')}")
+    
+    event_dispatcher.dispatch(user_id, 'contact.created', {'contact': contact_data}, source='make')
 
 def process_make_automation_triggered(data):
     """Process automation trigger from Make.com"""
@@ -221,8 +312,9 @@ def test_webhook():
     try:
         data = request.get_json()
         service = request.args.get('service', 'test')
+        owner = tenant_index.resolve(service, request.args.get('token'))
         
-        log_webhook(service, 'test_webhook', data or {})
+        log_webhook(service, 'test_webhook', data or {}, user_id=owner and owner.user_id)
         
         return jsonify({
             'status': 'success',
@@ -0,0 +1,52 @@
+"""Measure password verifications per second, per core, inline vs in the hashing process pool.
+
+Usage: python benchmarks/bench_password_hashing.py [--logins 200] [--threads 16] [--method scrypt:32768:8:1]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import check_password_hash, generate_password_hash
+from src.services.password_hashing import PasswordHasher
+
+
+def run(verify, stored, logins, threads):
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: verify(stored, 'BenchPassword123'), range(logins)))
+        elapsed = time.perf_counter() - start
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--method', default='scrypt:32768:8:1')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    stored = generate_password_hash('BenchPassword123', args.method)
+
+    hasher = PasswordHasher()
+    hasher.method = args.method
+    hasher.workers = cores
+    # Warm the pool so process spawn isn't counted as login time
+    hasher.verify(stored, 'BenchPassword123')
+
+    inline = run(check_password_hash, stored, args.logins, args.threads)
+    pooled = run(hasher.verify, stored, args.logins, args.threads)
+    hasher.shutdown()
+
+    print(f"method {args.method}, {cores} cores, {args.threads} request threads")
+    print(f"  inline: {inline:7.1f} logins/s  ({inline / cores:6.1f} per core)")
+    print(f"  pooled: {pooled:7.1f} logins/s  ({pooled / cores:6.1f} per core)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Writes per second with N concurrent writer threads, SQLite defaults vs the tuned storage config.
+
+Each write is one INSERT + COMMIT, like an un-batched webhook log write.
+Usage: python benchmarks/bench_sqlite_writers.py [--threads 8] [--seconds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from src.services.storage import engine_options
+
+
+def run(tuned, threads, seconds):
+    os.environ['SQLITE_PRAGMAS'] = '1' if tuned else '0'
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # The baseline is what main.py used to do: no engine options at all
+        engine = create_engine(uri, **engine_options(uri)) if tuned else create_engine(uri)
+        with engine.begin() as conn:
+            conn.execute(text(
+                'CREATE TABLE webhook_logs (id INTEGER PRIMARY KEY, service_name TEXT, payload TEXT, created_at TEXT)'
+            ))
+
+        writes = [0] * threads
+        locked = [0] * threads
+        deadline = time.monotonic() + seconds
+
+        def writer(index):
+            while time.monotonic() < deadline:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text(
+                            "INSERT INTO webhook_logs (service_name, payload, created_at) "
+                            "VALUES ('twilio', '{\"MessageStatus\": \"delivered\"}', datetime('now'))"
+                        ))
+                    writes[index] += 1
+                except OperationalError:
+                    locked[index] += 1
+
+        workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        engine.dispose()
+        return sum(writes) / seconds, sum(locked)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    for label, tuned in (('defaults', False), ('tuned', True)):
+        rate, locked = run(tuned, args.threads, args.seconds)
+        print(f"{label:>8}: {rate:8.1f} writes/s with {args.threads} writers, {locked} 'database is locked' errors")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Compare webhook throughput with synchronous logging vs the batched ingest queue.
+
+Usage: python benchmarks/bench_webhook_ingest.py [--requests 2000] [--threads 8]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from src.models.user import User, Integration, WebhookLog, db
+from src.models.events_db import init_events_db
+from src.routes.webhooks import webhooks_bp
+from src.services.tenant_index import tenant_index
+from src.services.webhook_ingest import webhook_ingest
+from src.services.webhook_dedupe import webhook_dedupe
+from src.services.webhook_signatures import TWILIO_HEADER, twilio_signature
+
+
+def build_app(db_path, async_ingest):
+    app = Flask(__name__)
+    uri = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    # Event tables are bound to 'events'; one file holds both here
+    app.config['SQLALCHEMY_BINDS'] = {'events': uri}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['WEBHOOK_INGEST_ASYNC'] = async_ingest
+    db.init_app(app)
+    init_events_db(app)
+    app.register_blueprint(webhooks_bp, url_prefix='/api')
+
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@peakwave.com', first_name='Bench', last_name='User')
+        user.set_password('BenchPassword123')
+        db.session.add(user)
+        db.session.commit()
+
+        integration = Integration(user_id=user.id, service_name='twilio', display_name='Twilio')
+        integration.set_config({'account_sid': 'ACbench', 'auth_token': 'bench'})
+        db.session.add(integration)
+        db.session.commit()
+
+    tenant_index.init_app(app)
+    tenant_index.invalidate()
+    # Fresh dedupe cache per run, so the async run isn't answered from keys the sync run left behind
+    webhook_dedupe.init_app(app)
+    webhook_ingest.init_app(app)
+    if async_ingest:
+        webhook_ingest.start()
+    return app
+
+
+def run(async_ingest, total, threads):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'), async_ingest)
+        per_thread = total // threads
+
+        def worker():
+            client = app.test_client()
+            for i in range(per_thread):
+                data = {
+                    'AccountSid': 'ACbench',
+                    # Unique per request: thread idents are reused, and a repeated id is a dedupe hit, not a write
+                    'MessageSid': f'SM{uuid.uuid4().hex}',
+                    'MessageStatus': 'delivered',
+                }
+                signature = twilio_signature(b'bench', 'http://localhost/api/webhooks/twilio', data.items())
+                client.post('/api/webhooks/twilio', data=data, headers={TWILIO_HEADER: signature})
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        start = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        # Rows still queued are written on shutdown; count them to prove nothing was lost
+        webhook_ingest.shutdown()
+        with app.app_context():
+            stored = WebhookLog.query.count()
+
+        return per_thread * threads / elapsed, stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    for label, async_ingest in (('sync', False), ('async', True)):
+        rps, stored = run(async_ingest, args.requests, args.threads)
+        print(f"{label:>5}: {rps:8.1f} req/s  ({stored} rows stored)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compare deep-page latency of offset pagination vs cursor pagination on /api/webhook-logs.
+
+Usage: python benchmarks/bench_webhook_log_pages.py [--rows 1000000] [--per-page 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from src.models.user import User, WebhookLog, db
+from src.models.events_db import init_events_db
+from src.models.webhook_log_indexes import ensure_indexes
+from src.routes.integrations import integrations_bp
+
+SERVICES = ['twilio', 'gohighlevel', 'zapier', 'make']
+
+
+def build_app(db_path):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'bench'
+    uri = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    # Event tables are bound to 'events'; one file holds both here
+    app.config['SQLALCHEMY_BINDS'] = {'events': uri}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    init_events_db(app)
+    app.register_blueprint(integrations_bp, url_prefix='/api')
+    return app
+
+
+def seed(app, rows, chunk=50000):
+    """Bulk insert synthetic logs with a Core executemany; returns the owning user id"""
+    with app.app_context():
+        db.create_all()
+        ensure_indexes(db.engine)
+        user = User(email='bench@peakwave.com', first_name='Bench', last_name='User')
+        user.set_password('BenchPassword123')
+        db.session.add(user)
+        db.session.commit()
+
+        # Derive column values from a real instance so the insert matches the model
+        template = WebhookLog(user_id=user.id, event_type='incoming_webhook', status='success')
+        template.set_payload({'MessageStatus': 'delivered'})
+        base = {c.key: getattr(template, c.key) for c in WebhookLog.__table__.columns
+                if c.key != 'id' and getattr(template, c.key) is not None}
+
+        start = datetime.utcnow() - timedelta(seconds=rows)
+        table = WebhookLog.__table__
+        for offset in range(0, rows, chunk):
+            batch = [
+                dict(base, service_name=SERVICES[i % 4], created_at=start + timedelta(seconds=i))
+                for i in range(offset, min(offset + chunk, rows))
+            ]
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+        return user.id
+
+
+def timed(client, url, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - start
+        assert response.status_code == 200, response.get_data(as_text=True)
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, response.get_json()
+
+
+def cursor_at(app, user_id, position):
+    """Cursor that resumes right after the row at the given offset"""
+    with app.app_context():
+        log = WebhookLog.query.filter_by(user_id=user_id).order_by(
+            WebhookLog.created_at.desc(), WebhookLog.id.desc()
+        ).offset(position).first()
+        return f"{log.created_at.isoformat()},{log.id}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'))
+        print(f"Seeding {args.rows} webhook logs...")
+        user_id = seed(app, args.rows)
+
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+
+        last_page = args.rows // args.per_page
+        print(f"{'page':>8} {'offset ms':>10} {'cursor ms':>10}")
+        for page in (1, 100, 1000, last_page // 2, last_page):
+            offset_ms, _ = timed(client, f"/api/webhook-logs?page={page}&per_page={args.per_page}")
+            after = cursor_at(app, user_id, (page - 1) * args.per_page - 1) if page > 1 else ''
+            cursor_ms, _ = timed(client, f"/api/webhook-logs?after={after}&per_page={args.per_page}")
+            print(f"{page:>8} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
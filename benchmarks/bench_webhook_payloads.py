@@ -0,0 +1,171 @@
+"""Bytes per webhook log row and list latency, JSON text payloads vs compressed payload rows.
+
+Seeds legacy rows (JSON text in webhook_logs.payload), measures them, runs the
+same compress_legacy() step as migration 0004 and measures again. Prints a
+JSON report.
+
+Usage: python benchmarks/bench_webhook_payloads.py [--rows 200000] [--per-page 100] [--codec zlib|zstd]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import text
+from sqlalchemy.orm import defer
+from src.models.user import WebhookLog, db
+from src.models.events_db import events_engine, events_session, init_events_db
+from src.models.webhook_payloads import WebhookPayload
+from src.services.payload_store import legacy_payload, log_summary, payload_store
+from src.services.json_provider import dumps
+
+
+def synthetic_payload(rng, service_name, i):
+    if service_name == 'twilio':
+        return {
+            'AccountSid': f'AC{rng.getrandbits(128):032x}', 'MessageSid': f'SM{rng.getrandbits(128):032x}',
+            'MessageStatus': rng.choice(['queued', 'sent', 'delivered', 'failed']), 'SmsStatus': 'sent',
+            'From': f'+1555{rng.randint(1000000, 9999999)}', 'To': f'+1555{rng.randint(1000000, 9999999)}',
+            'ApiVersion': '2010-04-01', 'NumSegments': '1', 'NumMedia': '0',
+            'Body': rng.choice(['Thanks, see you then!', 'Can we reschedule?', 'Yes please call me back']),
+        }
+    if service_name == 'gohighlevel':
+        return {
+            'type': rng.choice(['ContactCreate', 'ContactUpdate']), 'locationId': f'loc{rng.getrandbits(40):010x}',
+            'id': f'{rng.getrandbits(64):016x}', 'contactId': f'{rng.getrandbits(64):016x}',
+            'email': f'lead{i}@example.com', 'firstName': 'Lead', 'lastName': f'Number{i}',
+            'phone': f'+1555{rng.randint(1000000, 9999999)}', 'tags': ['inbound', 'website'],
+            'customFields': [{'id': 'source', 'value': 'landing-page'}, {'id': 'budget', 'value': '5000'}],
+            'dateAdded': datetime.utcnow().isoformat(),
+        }
+    return {
+        'event_type': 'new_lead', 'trigger': 'contact_created',
+        'lead': {'email': f'lead{i}@example.com', 'name': f'Lead {i}', 'company': 'Example Inc',
+                 'phone': f'+1555{rng.randint(1000000, 9999999)}', 'message': 'Interested in a demo'},
+        'zap_meta': {'id': f'{rng.getrandbits(32):08x}', 'timestamp': datetime.utcnow().isoformat()},
+    }
+
+
+def build_app(db_path, codec):
+    uri = f"sqlite:///{db_path}"
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_BINDS'] = {'events': uri}
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['WEBHOOK_PAYLOAD_CODEC'] = codec
+    db.init_app(app)
+    init_events_db(app)
+    payload_store.init_app(app)
+    return app
+
+
+def seed_legacy(rows, chunk=20000, seed=42):
+    rng = random.Random(seed)
+    services = ['twilio', 'gohighlevel', 'zapier', 'make']
+    start = datetime.utcnow() - timedelta(seconds=rows)
+    table = WebhookLog.__table__
+    engine = events_engine()
+    table.create(engine, checkfirst=True)
+    WebhookPayload.__table__.create(engine, checkfirst=True)
+    for offset in range(0, rows, chunk):
+        batch = []
+        for i in range(offset, min(offset + chunk, rows)):
+            service_name = services[i % 4]
+            batch.append({
+                'user_id': 1, 'service_name': service_name, 'event_type': 'incoming_webhook',
+                'status': 'success', 'created_at': start + timedelta(seconds=i),
+                'payload': json.dumps(synthetic_payload(rng, service_name, i)),
+            })
+        with engine.begin() as connection:
+            connection.execute(table.insert(), batch)
+
+
+def database_bytes():
+    engine = events_engine()
+    with engine.connect() as connection:
+        connection.execute(text('VACUUM'))
+        page_size = connection.execute(text('PRAGMA page_size')).scalar()
+        pages = connection.execute(text('PRAGMA page_count')).scalar()
+    return page_size * pages
+
+
+def time_pages(serialize, query, per_page, pages=50):
+    timings = []
+    for page in range(pages):
+        started = time.perf_counter()
+        logs = query.order_by(WebhookLog.created_at.desc(), WebhookLog.id.desc()).offset(
+            page * per_page).limit(per_page).all()
+        dumps(serialize(logs))
+        timings.append(time.perf_counter() - started)
+        events_session.expire_all()
+    timings.sort()
+    return {'p50_ms': round(timings[len(timings) // 2] * 1000, 2), 'max_ms': round(timings[-1] * 1000, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--codec', default='zlib')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = build_app(os.path.join(tmp, 'bench.db'), args.codec)
+        with app.app_context():
+            seed_legacy(args.rows)
+            before_bytes = database_bytes()
+            # What listings did before: load every column and decode every payload
+            before_list = time_pages(
+                lambda logs: [dict(log_summary(log), payload=legacy_payload(log.payload)) for log in logs],
+                events_session.query(WebhookLog), args.per_page
+            )
+
+            started = time.perf_counter()
+            with events_engine().begin() as connection:
+                payload_store.compress_legacy(connection)
+            migration_seconds = time.perf_counter() - started
+
+            after_bytes = database_bytes()
+            after_list = time_pages(
+                lambda logs: [log_summary(log) for log in logs],
+                events_session.query(WebhookLog).options(defer(WebhookLog.payload)), args.per_page
+            )
+            after_list_with_payloads = time_pages(
+                lambda logs: (lambda payloads: [dict(log_summary(log), payload=payloads[log.id]) for log in logs])(
+                    payload_store.load(logs)),
+                events_session.query(WebhookLog).options(defer(WebhookLog.payload)), args.per_page
+            )
+            raw, stored = events_session.query(
+                db.func.sum(WebhookPayload.raw_size), db.func.sum(db.func.length(WebhookPayload.data))
+            ).one()
+
+    print(json.dumps({
+        'rows': args.rows,
+        'codec': payload_store.codec,
+        'bytes_per_row': {
+            'before': round(before_bytes / args.rows, 1),
+            'after': round(after_bytes / args.rows, 1),
+        },
+        'payload_bytes_per_row': {
+            'json': round(raw / args.rows, 1),
+            'compressed': round(stored / args.rows, 1),
+        },
+        'list_page': {
+            'per_page': args.per_page,
+            'before': before_list,
+            'after': after_list,
+            'after_include_payload': after_list_with_payloads,
+        },
+        'migration_seconds': round(migration_seconds, 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+"""End-to-end load benchmark for the API.
+
+Seeds a throwaway database with synthetic users, integrations and webhook
+logs, starts the app under a real WSGI server (gunicorn when installed,
+otherwise the threaded Werkzeug server) with a local stub in place of
+Zapier/Make, drives a fixed request mix at the given concurrency and writes
+throughput and p50/p95/p99 latency per route as JSON.
+
+Usage: python -m benchmarks.load [--users 200] [--logs 1000000] [--concurrency 16]
+                                 [--duration 60] [--output load.json]
+
+Everything random is seeded, so two runs against the same --db-dir issue the
+same requests; compare their JSON reports to spot regressions.
+"""
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from benchmarks.load.driver import MIX, LoadDriver, summarize
+from benchmarks.load.seed import FIXTURES, load_fixtures, seed, server_env
+from benchmarks.load.server import ROOT, start_server, stop_server
+from benchmarks.load.stub import ProviderStub
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--logs', type=int, default=1000000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=int, default=60, help='measured seconds')
+    parser.add_argument('--warmup', type=int, default=5, help='seconds excluded from the results')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--stub-port', type=int, default=18081)
+    parser.add_argument('--stub-latency', type=float, default=0.05, help='seconds the provider stub waits')
+    parser.add_argument('--db-dir', help='reuse a seeded database directory instead of a fresh one')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    # Webhook URLs stored at seed time point at the stub, so its port must be stable
+    stub = ProviderStub(args.stub_port, args.stub_latency).start()
+    temporary = None
+    db_dir = args.db_dir
+    if db_dir is None:
+        temporary = tempfile.TemporaryDirectory()
+        db_dir = temporary.name
+    os.makedirs(db_dir, exist_ok=True)
+
+    try:
+        if os.path.exists(os.path.join(db_dir, FIXTURES)):
+            fixtures = load_fixtures(db_dir)
+            print(f"Reusing seeded database in {db_dir}", file=sys.stderr)
+        else:
+            print(f"Seeding {args.users} users and {args.logs} webhook logs into {db_dir}", file=sys.stderr)
+            fixtures = seed(db_dir, args.users, args.logs, stub.url, random_seed=args.seed)
+
+        server, process = start_server(server_env(db_dir), args.port, args.workers, args.threads)
+        try:
+            print(f"Driving {server} at concurrency {args.concurrency} for {args.duration}s", file=sys.stderr)
+            driver = LoadDriver(f'http://127.0.0.1:{args.port}', fixtures, args.concurrency,
+                                args.duration, args.warmup, args.seed)
+            seconds = driver.run()
+        finally:
+            stop_server(process)
+    finally:
+        stub.stop()
+        if temporary is not None:
+            temporary.cleanup()
+
+    report = {
+        'run': {
+            'started_at': datetime.utcnow().isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'server': server,
+        },
+        'config': {
+            'users': len(fixtures['users']),
+            'logs': args.logs,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'workers': args.workers if server == 'gunicorn' else 1,
+            'threads': args.threads if server == 'gunicorn' else None,
+            'stub_latency': args.stub_latency,
+            'seed': args.seed,
+            'mix': MIX,
+        },
+        **summarize(driver, seconds),
+        'provider_stub_requests': stub.requests,
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
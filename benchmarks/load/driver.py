@@ -0,0 +1,164 @@
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+from src.services.webhook_signatures import TWILIO_HEADER, twilio_signature
+
+# Route name: relative weight in the request mix
+MIX = {
+    'webhook_twilio': 25,
+    'webhook_gohighlevel': 10,
+    'webhook_zapier': 10,
+    'webhook_make': 10,
+    'login': 5,
+    'integrations': 15,
+    'webhook_logs': 15,
+    'webhook_logs_cursor': 10,
+}
+
+
+def build_request(name, user, password, rng, state):
+    """(method, path, kwargs) for one request of the mix. Webhook bodies carry a fresh id, so none is a dedupe hit"""
+    if name == 'webhook_twilio':
+        return 'POST', '/api/webhooks/twilio', {'data': {
+            'AccountSid': user['account_sid'],
+            'MessageSid': f"SM{rng.getrandbits(64):016x}",
+            'MessageStatus': rng.choice(['queued', 'sent', 'delivered']),
+        }}
+    if name == 'webhook_gohighlevel':
+        return 'POST', '/api/webhooks/gohighlevel', {'json': {
+            'type': rng.choice(['ContactCreate', 'ContactUpdate']),
+            'id': uuid.uuid4().hex,
+            'locationId': user['location_id'],
+            'contact': {'id': f"c{rng.getrandbits(32):08x}", 'email': 'lead@example.com'},
+        }}
+    if name == 'webhook_zapier':
+        return 'POST', f"/api/webhooks/zapier/{user['zapier_token']}", {'json': {
+            'event_type': 'new_lead', 'id': uuid.uuid4().hex, 'lead': {'email': 'lead@example.com'},
+        }}
+    if name == 'webhook_make':
+        return 'POST', f"/api/webhooks/make/{user['make_token']}", {'json': {
+            'trigger': 'contact_created', 'id': uuid.uuid4().hex, 'contact': {'email': 'lead@example.com'},
+        }}
+    if name == 'login':
+        return 'POST', '/api/auth/login', {'json': {'email': user['email'], 'password': password}}
+    if name == 'integrations':
+        return 'GET', '/api/integrations', {}
+    if name == 'webhook_logs':
+        return 'GET', '/api/webhook-logs', {'params': {'page': rng.randint(1, 20), 'per_page': 50}}
+    if name == 'webhook_logs_cursor':
+        # An empty ?after= starts cursor mode at the newest page; the walk restarts when it runs out
+        return 'GET', '/api/webhook-logs', {'params': {'per_page': 50, 'after': state.get('cursor') or ''}}
+    raise ValueError(name)
+
+
+class LoadDriver:
+    """Closed-loop load: `concurrency` virtual users, each issuing the next request as soon as one returns"""
+
+    def __init__(self, base_url, fixtures, concurrency, duration, warmup=5, random_seed=42):
+        self.base_url = base_url
+        self.fixtures = fixtures
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.random_seed = random_seed
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def run(self):
+        start = time.monotonic()
+        measure_from = start + self.warmup
+        deadline = measure_from + self.duration
+        threads = [
+            threading.Thread(target=self._virtual_user, args=(index, measure_from, deadline))
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.duration
+
+    def _virtual_user(self, index, measure_from, deadline):
+        rng = random.Random(self.random_seed + index)
+        users = self.fixtures['users']
+        user = users[index % len(users)]
+        password = self.fixtures['password']
+        names, weights = zip(*MIX.items())
+        session = requests.Session()
+        state = {}
+
+        # Authenticated routes need the session cookie
+        session.post(f'{self.base_url}/api/auth/login', json={'email': user['email'], 'password': password})
+
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, kwargs = build_request(name, user, password, rng, state)
+            if name == 'webhook_twilio':
+                kwargs['headers'] = {TWILIO_HEADER: twilio_signature(
+                    user['auth_token'].encode(), self.base_url + path, kwargs['data'].items()
+                )}
+            started = time.monotonic()
+            try:
+                response = session.request(method, self.base_url + path, timeout=30, **kwargs)
+                status = response.status_code
+                if name == 'webhook_logs_cursor' and status == 200:
+                    state['cursor'] = response.json().get('next_cursor')
+            except requests.RequestException:
+                status = None
+            elapsed = time.monotonic() - started
+
+            if started < measure_from:
+                continue
+            with self._lock:
+                self.latencies[name].append(elapsed)
+                self.statuses[name][str(status)] += 1
+                if status is None or status >= 400:
+                    self.errors[name] += 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(driver, seconds):
+    routes = {}
+    total = errors = 0
+    for name, values in sorted(driver.latencies.items()):
+        values.sort()
+        total += len(values)
+        errors += driver.errors[name]
+        routes[name] = {
+            'requests': len(values),
+            'errors': driver.errors[name],
+            'statuses': dict(driver.statuses[name]),
+            'throughput_rps': round(len(values) / seconds, 2),
+            'mean_ms': round(sum(values) / len(values) * 1000, 2),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2),
+        }
+
+    everything = sorted(v for values in driver.latencies.values() for v in values)
+    return {
+        'totals': {
+            'requests': total,
+            'errors': errors,
+            'throughput_rps': round(total / seconds, 2),
+            'p50_ms': round(percentile(everything, 50) * 1000, 2) if everything else None,
+            'p95_ms': round(percentile(everything, 95) * 1000, 2) if everything else None,
+            'p99_ms': round(percentile(everything, 99) * 1000, 2) if everything else None,
+        },
+        'routes': routes,
+    }
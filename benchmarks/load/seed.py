@@ -0,0 +1,123 @@
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from werkzeug.security import generate_password_hash
+
+PASSWORD = 'LoadTestPassword123'
+SERVICES = ['twilio', 'gohighlevel', 'zapier', 'make']
+FIXTURES = 'fixtures.json'
+
+
+def server_env(db_dir):
+    """Environment shared by the seeding step and the server under test"""
+    return {
+        'DATABASE_URL': f"sqlite:///{os.path.join(db_dir, 'app.db')}",
+        'EVENTS_DATABASE_URL': f"sqlite:///{os.path.join(db_dir, 'events.db')}",
+        'WEBHOOK_LOG_ARCHIVE_DIR': os.path.join(db_dir, 'archive'),
+        # Keep the seeded rows stable for the length of the run
+        'WEBHOOK_LOG_ARCHIVE_INTERVAL': '0',
+        # Every virtual user logs in from 127.0.0.1
+        'LOGIN_THROTTLE_IP_PER_MINUTE': '1000000',
+        'LOGIN_THROTTLE_EMAIL_PER_MINUTE': '1000000',
+    }
+
+
+def seed(db_dir, users, logs, stub_url, chunk=50000, random_seed=42):
+    """Create the databases and write fixtures.json describing what the driver can target.
+
+    Identifiers are derived from the user index, so the same arguments always
+    produce the same data.
+    """
+    os.environ.update(server_env(db_dir))
+    from src.main import create_app
+    from src.models.user import User, Integration, WebhookLog, db
+    from src.models.events_db import events_engine
+    from src.models.migrations import upgrade
+    from src.models.webhook_payloads import WebhookPayload
+    from src.services.payload_store import payload_store
+
+    app = create_app()
+    rng = random.Random(random_seed)
+    fixtures = {'password': PASSWORD, 'users': []}
+
+    with app.app_context():
+        upgrade()
+
+        # Hashing is deliberately slow; one hash made with the live method serves every user
+        password_hash = generate_password_hash(PASSWORD, method=app.config['PASSWORD_HASH_METHOD'])
+        for i in range(users):
+            user = User(email=f'load{i:06d}@peakwave.com', first_name='Load', last_name=f'User{i}')
+            user.password_hash = password_hash
+            db.session.add(user)
+        db.session.commit()
+
+        for user in User.query.filter(User.email.like('load%@peakwave.com')).order_by(User.id):
+            i = len(fixtures['users'])
+            identifiers = {
+                'twilio': {'account_sid': f'ACload{i:026d}', 'auth_token': 'load'},
+                'gohighlevel': {'location_id': f'loadloc{i:06d}', 'api_key': 'load'},
+                'zapier': {'inbound_token': f'loadzap{i:017d}'},
+                'make': {'inbound_token': f'loadmake{i:016d}'},
+            }
+            for service, config in identifiers.items():
+                integration = Integration(
+                    user_id=user.id,
+                    service_name=service,
+                    display_name=service.title(),
+                    webhook_url=f'{stub_url}/{service}/{i}' if service in ('zapier', 'make') else '',
+                    is_active=True
+                )
+                integration.set_config(config)
+                db.session.add(integration)
+            fixtures['users'].append({
+                'id': user.id,
+                'email': user.email,
+                'account_sid': identifiers['twilio']['account_sid'],
+                'auth_token': identifiers['twilio']['auth_token'],
+                'location_id': identifiers['gohighlevel']['location_id'],
+                'zapier_token': identifiers['zapier']['inbound_token'],
+                'make_token': identifiers['make']['inbound_token'],
+            })
+        db.session.commit()
+
+        # Derive column values from a real instance so the insert matches the model
+        template = WebhookLog(user_id=0, service_name='twilio', event_type='incoming_webhook', status='success')
+        payload_store.attach(template, {'MessageStatus': 'delivered', 'MessageSid': 'SMload'})
+        base = {c.key: getattr(template, c.key) for c in WebhookLog.__table__.columns
+                if c.key != 'id' and getattr(template, c.key) is not None}
+        codec, data, raw_size = template._stored_payload
+
+        user_ids = [u['id'] for u in fixtures['users']]
+        # Spread over the retention window so date filters and archive fallthrough see realistic data
+        start = datetime.utcnow() - timedelta(days=29)
+        step = timedelta(days=29) / max(logs, 1)
+        table = WebhookLog.__table__
+        engine = events_engine()
+        with engine.connect() as connection:
+            first_id = (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+        for offset in range(0, logs, chunk):
+            ids = range(first_id + offset, first_id + min(offset + chunk, logs))
+            batch = [
+                dict(base, id=log_id, user_id=rng.choice(user_ids), service_name=SERVICES[i % 4],
+                     status='failed' if rng.random() < 0.02 else 'success',
+                     created_at=start + step * i)
+                for i, log_id in zip(range(offset, offset + len(ids)), ids)
+            ]
+            with engine.begin() as connection:
+                connection.execute(table.insert(), batch)
+                connection.execute(WebhookPayload.__table__.insert(), [
+                    {'log_id': log_id, 'codec': codec, 'data': data, 'raw_size': raw_size} for log_id in ids
+                ])
+            print(f"  {min(offset + chunk, logs)}/{logs} webhook logs")
+
+    with open(os.path.join(db_dir, FIXTURES), 'w') as f:
+        json.dump(fixtures, f)
+    return fixtures
+
+
+def load_fixtures(db_dir):
+    with open(os.path.join(db_dir, FIXTURES)) as f:
+        return json.load(f)
@@ -0,0 +1,52 @@
+import importlib.util
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def server_command(port, workers, threads):
+    """gunicorn when installed (what production runs), otherwise the threaded Werkzeug server"""
+    if importlib.util.find_spec('gunicorn'):
+        return 'gunicorn', [
+            sys.executable, '-m', 'gunicorn',
+            '--workers', str(workers), '--threads', str(threads),
+            '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+            'src.main:create_app()',
+        ]
+    return 'werkzeug', [sys.executable, '-m', 'benchmarks.load.server', str(port)]
+
+
+def start_server(env, port, workers, threads, timeout=60):
+    """Start the app in a child process and wait until /health answers"""
+    name, command = server_command(port, workers, threads)
+    process = subprocess.Popen(command, cwd=ROOT, env=dict(os.environ, **env))
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1):
+                return name, process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{name} did not become healthy within {timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+if __name__ == '__main__':
+    from werkzeug.serving import run_simple
+    from src.main import create_app
+
+    run_simple('127.0.0.1', int(sys.argv[1]), create_app(), threaded=True)
@@ -0,0 +1,233 @@
+"""Offline image build: dedupe by content hash, emit resized WebP/AVIF variants, rewrite <img> tags.
+
+Every <img> in the HTML pages that points at a local PNG/JPEG becomes a
+<picture> with AVIF and WebP srcsets and explicit width/height; the original
+stays as the fallback src. References to byte-identical copies collapse onto
+one file, and references to a missing file fall back to a same-named image
+with another extension. Variants go to assets/optimized/ and a report of
+bytes saved to assets/optimized/report.json. Safe to re-run.
+
+Needs Pillow (AVIF needs Pillow >= 11.2 or pillow-avif-plugin).
+Usage: python scripts/optimize_images.py [src/static] [--widths 96,160,320,640,960,1280,1920] [--delete-duplicates]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import defaultdict
+
+from PIL import Image, features
+
+if not features.check('avif'):
+    try:
+        import pillow_avif  # noqa: F401  registers the AVIF plugin
+    except ImportError:
+        pass
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+DEFAULT_WIDTHS = (96, 160, 320, 640, 960, 1280, 1920)
+OUTPUT_DIR = 'assets/optimized'
+FORMATS = {
+    # format: (Pillow name, save options)
+    'avif': ('AVIF', {'quality': 55, 'speed': 4}),
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+}
+IMG_TAG = re.compile(r'<img\b[^>]*>')
+PICTURE_BLOCK = re.compile(r'<picture data-optimized>.*?(<img\b[^>]*>)\s*</picture>', re.S)
+ATTRIBUTE = re.compile(r'\b([\w-]+)="([^"]*)"')
+# Rendered width by image class (from styles.css), for the srcset `sizes` hint
+SIZES_BY_CLASS = {
+    'hero-bg-image': '100vw',
+    'hero-logo-img': '80px',
+    'avatar-img': '80px',
+    'footer-logo': '32px',
+}
+
+
+def digest(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def find_images(static_dir):
+    """Relative path -> content hash for every PNG/JPEG outside the output directory"""
+    images = {}
+    for directory, _, files in os.walk(static_dir):
+        rel_dir = os.path.relpath(directory, static_dir).replace(os.sep, '/')
+        if rel_dir == OUTPUT_DIR or rel_dir.startswith(OUTPUT_DIR + '/'):
+            continue
+        for name in files:
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = name if rel_dir == '.' else f"{rel_dir}/{name}"
+                images[path] = digest(os.path.join(static_dir, path))
+    return images
+
+
+def group_duplicates(images, referenced):
+    """Hash -> canonical path; referenced files win, then the shortest name"""
+    by_hash = defaultdict(list)
+    for path, content_hash in images.items():
+        by_hash[content_hash].append(path)
+    canonical = {}
+    for content_hash, paths in by_hash.items():
+        canonical[content_hash] = min(paths, key=lambda p: (p not in referenced, len(p), p))
+    return canonical, {h: sorted(p) for h, p in by_hash.items() if len(p) > 1}
+
+
+def resolve(src, images):
+    """Existing image for an <img src>, trying other extensions when the file is missing"""
+    if src in images:
+        return src
+    stem = os.path.splitext(src)[0]
+    for ext in IMAGE_EXTENSIONS:
+        if stem + ext in images:
+            return stem + ext
+    return None
+
+
+def build_variants(static_dir, path, widths):
+    """Write resized variants for one image; returns (width, height, {format: [(w, path, bytes)]})"""
+    source = os.path.join(static_dir, path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    os.makedirs(os.path.join(static_dir, OUTPUT_DIR), exist_ok=True)
+
+    with Image.open(source) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        width, height = image.size
+        targets = sorted({w for w in widths if w < width} | {width})
+        variants = defaultdict(list)
+        for fmt, (pillow_format, options) in FORMATS.items():
+            if pillow_format not in Image.registered_extensions().values():
+                print(f"  {fmt}: not supported by this Pillow build, skipped")
+                continue
+            for target in targets:
+                out_path = f"{OUTPUT_DIR}/{stem}-{target}.{fmt}"
+                out_file = os.path.join(static_dir, out_path)
+                if not os.path.exists(out_file) or os.path.getmtime(out_file) < os.path.getmtime(source):
+                    resized = image if target == width else image.resize(
+                        (target, round(height * target / width)), Image.Resampling.LANCZOS
+                    )
+                    resized.save(out_file, pillow_format, **options)
+                variants[fmt].append((target, out_path, os.path.getsize(out_file)))
+    return width, height, variants
+
+
+def picture_tag(img_tag, src, width, height, variants):
+    attributes = dict(ATTRIBUTE.findall(img_tag))
+    # sizes only means something next to a srcset, so it goes on the <source>s, never the fallback <img>
+    sizes = attributes.pop('sizes', None) or next(
+        (SIZES_BY_CLASS[c] for c in attributes.get('class', '').split() if c in SIZES_BY_CLASS), '100vw'
+    )
+    attributes['src'] = src
+    # Keep author-set dimensions (CSS may depend on them); otherwise use the intrinsic size
+    attributes.setdefault('width', str(width))
+    attributes.setdefault('height', str(height))
+    attributes.setdefault('decoding', 'async')
+
+    sources = ''.join(
+        f'<source type="image/{fmt}" srcset="{", ".join(f"{path} {w}w" for w, path, _ in items)}" sizes="{sizes}">'
+        for fmt, items in variants.items()
+    )
+    img = '<img ' + ' '.join(f'{name}="{value}"' for name, value in attributes.items()) + '>'
+    return f'<picture data-optimized>{sources}{img}</picture>'
+
+
+def rewrite_page(html, rewrite):
+    # Unwrap pictures from an earlier run so their <img> is regenerated, not wrapped twice
+    html = PICTURE_BLOCK.sub(lambda m: m.group(1), html)
+    return IMG_TAG.sub(lambda m: rewrite(m.group(0)), html)
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    parser = argparse.ArgumentParser()
+    parser.add_argument('static_dir', nargs='?', default=os.path.join(root, 'src', 'static'))
+    parser.add_argument('--widths', default=','.join(map(str, DEFAULT_WIDTHS)))
+    parser.add_argument('--delete-duplicates', action='store_true',
+                        help='remove byte-identical copies once no page references them')
+    args = parser.parse_args()
+    static_dir = args.static_dir
+    widths = [int(w) for w in args.widths.split(',')]
+
+    pages = [name for name in os.listdir(static_dir) if name.endswith('.html')]
+    html_by_page = {}
+    referenced = set()
+    for page in pages:
+        with open(os.path.join(static_dir, page), encoding='utf-8') as f:
+            html_by_page[page] = f.read()
+        for tag in IMG_TAG.findall(PICTURE_BLOCK.sub(lambda m: m.group(1), html_by_page[page])):
+            referenced.add(dict(ATTRIBUTE.findall(tag)).get('src'))
+
+    images = find_images(static_dir)
+    canonical, duplicates = group_duplicates(images, referenced)
+    report = {'images': {}, 'duplicates': [], 'missing_references': [], 'bytes_saved': 0}
+    built = {}
+
+    def rewrite(img_tag):
+        src = dict(ATTRIBUTE.findall(img_tag)).get('src', '')
+        if '://' in src or not src.lower().endswith(IMAGE_EXTENSIONS):
+            return img_tag
+        found = resolve(src, images)
+        if found is None:
+            report['missing_references'].append(src)
+            print(f"  missing: {src}")
+            return img_tag
+        path = canonical[images[found]]
+        if path != src:
+            print(f"  {src} -> {path}")
+        if path not in built:
+            print(f"{path}")
+            built[path] = build_variants(static_dir, path, widths)
+            width, height, variants = built[path]
+            original = os.path.getsize(os.path.join(static_dir, path))
+            # What a modern browser downloads at the largest width: the smallest format offered
+            largest = min((items[-1][2] for items in variants.values()), default=original)
+            report['images'][path] = {
+                'width': width,
+                'height': height,
+                'original_bytes': original,
+                'largest_variant_bytes': largest,
+                'variants': {fmt: [{'width': w, 'path': p, 'bytes': b} for w, p, b in items]
+                             for fmt, items in variants.items()},
+            }
+            report['bytes_saved'] += max(original - largest, 0)
+        width, height, variants = built[path]
+        return picture_tag(img_tag, path, width, height, variants) if variants else img_tag
+
+    for page, html in html_by_page.items():
+        rewritten = rewrite_page(html, rewrite)
+        if rewritten != html:
+            with open(os.path.join(static_dir, page), 'w', encoding='utf-8') as f:
+                f.write(rewritten)
+
+    for content_hash, paths in duplicates.items():
+        keep = canonical[content_hash]
+        copies = [p for p in paths if p != keep]
+        size = os.path.getsize(os.path.join(static_dir, keep))
+        report['duplicates'].append({'keep': keep, 'copies': copies, 'bytes_each': size})
+        if args.delete_duplicates:
+            for copy in copies:
+                os.remove(os.path.join(static_dir, copy))
+            report['bytes_saved'] += size * len(copies)
+
+    report_path = os.path.join(static_dir, OUTPUT_DIR, 'report.json')
+    os.makedirs(os.path.dirname(report_path), exist_ok=True)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print()
+    for entry in report['duplicates']:
+        action = 'deleted' if args.delete_duplicates else 'duplicates of'
+        print(f"{', '.join(entry['copies'])} {action} {entry['keep']} ({entry['bytes_each']} bytes each)")
+    for path, entry in report['images'].items():
+        print(f"{path}: {entry['original_bytes']} -> {entry['largest_variant_bytes']} bytes at {entry['width']}px")
+    print(f"Saved {report['bytes_saved']} bytes; report written to {report_path}")
+    return 1 if report['missing_references'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())